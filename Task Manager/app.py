@@ -10,12 +10,15 @@ tasks based on various criteria such as due date, priority, status, and task nam
 """
 
 import tkinter as tk
-from database import cursor, db_connection
-from taskManager import TaskManagerApp
+from storage import ReplicaBackend, get_backend
+from migrate import apply_migrations
+from worker import BackgroundWorker
+import users
 
 class LoginScreen:
     def __init__(self, master):
         self.master = master
+        self.backend = get_backend()
         master.title("User Login")
 
         self.welcome_label = tk.Label(master, text="Welcome to Task Manager!", font=("Helvetica", 18))
@@ -36,28 +39,41 @@ class LoginScreen:
         self.register_button = tk.Button(self.button_frame, text="Register", command=self.register)
         self.register_button.pack(side=tk.LEFT, padx=5)
 
+        self.loading_label = tk.Label(master, text="", fg="gray")
+        self.loading_label.pack()
+        self.worker = BackgroundWorker(master, on_busy_change=self.show_loading)
+        self.worker.submit("connect", self.connect)
+
+    def connect(self):
+        apply_migrations(self.backend)
+        if isinstance(self.backend, ReplicaBackend):
+            from replica import prepare_replica
+
+            prepare_replica(self.backend)
+
+    def show_loading(self, busy):
+        self.loading_label.config(text="Loading..." if busy else "")
+
     def login(self):
         username = self.username_entry.get()
-        cursor.execute("SELECT * FROM users WHERE username=%s", (username,))
-        user = cursor.fetchone() 
-        if user:
+        self.worker.submit("login", self.get_user_id, username,
+                           on_success=lambda user_id: self.on_login(username, user_id))
+
+    def on_login(self, username, user_id):
+        if user_id:
             print(f"Login successful! Welcome back, {username}!")
-            self.open_task_manager(username)
+            self.open_task_manager(username, user_id)
         else:
             print("User not found. Please register or check your username.")
     
     def get_user_id(self, username):
-        cursor.execute("SELECT id FROM users WHERE username=%s", (username,))
-        user = cursor.fetchone()
-        if user:
-            return user[0]  
-        else:
-            print("User not found.")
-            return None
+        return users.get_user_id(self.backend, username)
+
+    def open_task_manager(self, username, user_id):
+        from taskManager import TaskManagerApp
 
-    def open_task_manager(self, username):
+        self.worker.shutdown()
         self.master.destroy()  
-        user_id = self.get_user_id(username)  
         task_manager = TaskManagerApp(user_id, username)
         task_manager.run()
 
@@ -80,8 +96,13 @@ class LoginScreen:
 
     def create_user(self, register_window):
         new_username = self.register_username_entry.get()
-        cursor.execute("INSERT INTO users (username) VALUES (%s)", (new_username,))
-        db_connection.commit()
+        self.worker.submit(None, self.insert_user, new_username,
+                           on_success=lambda user_id: self.on_user_created(register_window, new_username))
+
+    def insert_user(self, username):
+        return users.insert_user(self.backend, username)
+
+    def on_user_created(self, register_window, new_username):
         print(f"New user created! Welcome, {new_username}!")
         self.register_username_entry.delete(0, tk.END)
         register_window.destroy() 
@@ -0,0 +1,646 @@
+"""
+Program: benchmark.py
+Measures how TaskManager operations behave as a user's task count grows.
+Usage: python benchmark.py [load|search|filters] [task counts...]   (default: load 1000 5000 20000)
+       python benchmark.py import [task counts...]         (default: 10000 100000)
+       python benchmark.py stress [session counts...]      (default: 50 200)
+       python benchmark.py table [task counts...]          (default: 1000 10000 100000, needs a display)
+       python benchmark.py startup [history file]          (default: startup_history.jsonl)
+       python benchmark.py sort [task counts...]           (default: 100000)
+       python benchmark.py server [client counts...]       (default: 10 50)
+       python benchmark.py suite [task counts...]          (default: 1000 10000 100000)
+       python benchmark.py compare [commit] [commit]       (default: the last two runs in benchmark_history.jsonl)
+load, search and import run against the configured storage backend (TASKMANAGER_BACKEND) using a throwaway user.
+stress drives concurrent TaskManager sessions through a SQLite backend in a temporary directory.
+startup times `import app` with -X importtime and appends the result to a JSON lines history file.
+server runs server.py on a temporary SQLite database and reports requests/s and latency percentiles
+for concurrent keep-alive clients issuing a mix of page reads, statistics, creates and updates.
+suite seeds a temporary SQLite database with synthetic users and tasks (fixed seed) and reports latency and
+query count for each TaskManager operation. Each run is appended to benchmark_history.jsonl with its commit
+and compared with the previous run from another commit.
+sort compares memory per task and sort time of Task against a plain attribute-dict object sorted by tuple.index.
+"""
+
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tkinter as tk
+from tkinter import ttk
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from database import POOL_SIZE
+from migrate import apply_migrations
+from server import TaskServer, TaskService
+from storage import SQLiteBackend, get_backend
+from table import VirtualTable
+from taskManager import Task, TaskManager, BUCKETS, sort_tasks
+from transfer import export_tasks, import_tasks
+
+PRIORITIES = ("Normal", "Medium", "High")
+STATUSES = ("Pending", "In Progress", "Completed")
+WORDS = ("report", "meeting", "invoice", "review", "deploy", "design", "budget", "client", "email", "release")
+SEARCH_TERMS = ("invoice", "rev", "client budget", "deploy 42")
+SEED = 42
+
+
+def create_user(username):
+    with get_backend().cursor(commit=True) as cursor:
+        cursor.execute("INSERT INTO users (username) VALUES (%s)", (username,))
+        return cursor.lastrowid
+
+
+def delete_user(user_id):
+    with get_backend().cursor(commit=True) as cursor:
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+
+
+def generate_rows(count, seed=SEED):
+    random_state = random.Random(seed)
+    today = date.today()
+    return [(f"Task {i} {random_state.choice(WORDS)}", today + timedelta(days=random_state.randint(-15, 44)),
+             random_state.choice(PRIORITIES),
+             f"Comment {i} about the {random_state.choice(WORDS)} for the {random_state.choice(WORDS)}",
+             random_state.choice(STATUSES))
+            for i in range(count)]
+
+
+def insert_tasks(user_id, count):
+    rows = [(user_id, *row) for row in generate_rows(count)]
+    with get_backend().cursor(commit=True) as cursor:
+        cursor.executemany("INSERT INTO tasks (user_id, title, due_date, priority, comments, status) VALUES (%s, %s, %s, %s, %s, %s)", rows)
+
+
+def run_with_user(count, benchmark):
+    user_id = create_user(f"benchmark_{count}_{time.time_ns()}")
+    try:
+        insert_tasks(user_id, count)
+        benchmark(TaskManager(user_id))
+    finally:
+        delete_user(user_id)
+
+
+def bench_load(task_manager):
+    start = time.perf_counter()
+    tasks = task_manager.load_all()
+    elapsed = time.perf_counter() - start
+    print(f"load_all: {len(tasks):>7} tasks in {elapsed * 1000:9.1f} ms ({len(tasks) / elapsed:,.0f} tasks/s)")
+
+
+def bench_search(task_manager):
+    tasks = task_manager.load_all()
+    for term in SEARCH_TERMS:
+        start = time.perf_counter()
+        with get_backend().cursor() as cursor:
+            for keyword in term.split():
+                cursor.execute("SELECT id FROM tasks WHERE (title LIKE %s OR comments LIKE %s) AND user_id = %s",
+                               (f"%{keyword}%", f"%{keyword}%", task_manager.user_id))
+                cursor.fetchall()
+        like_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matches = task_manager.filter_tasks_by_title(term)
+        index_elapsed = time.perf_counter() - start
+        print(f"search {term!r:>15} over {len(tasks):>7} tasks: LIKE scan {like_elapsed * 1000:8.2f} ms, "
+              f"index {index_elapsed * 1000:8.2f} ms ({len(matches)} matches)")
+
+
+def bench_filters(task_manager):
+    task_manager.load_all()
+    filters = [(task_manager.filter_tasks_by_status, status) for status in STATUSES] + \
+              [(task_manager.filter_tasks_by_priority, priority) for priority in PRIORITIES] + \
+              [(task_manager.filter_tasks_by_due_date, date.today().isoformat()), (task_manager.filter_tasks_by_title, "invoice")]
+
+    def run_filters():
+        start = time.perf_counter()
+        for method, keyword in filters:
+            method(keyword)
+        return time.perf_counter() - start
+
+    cold = run_filters()
+    warm = run_filters()
+    task_manager.update_task(next(iter(task_manager.tasks.values())))
+    invalidated = run_filters()
+    stats = task_manager.get_cache_stats()
+    print(f"filters: {len(task_manager.tasks):>7} tasks, {len(filters)} filters: cold {cold * 1000:8.1f} ms, "
+          f"cached {warm * 1000:8.2f} ms, after a write {invalidated * 1000:8.1f} ms "
+          f"(hits {stats['hits']}, misses {stats['misses']}, stale {stats['stale']})")
+
+
+def bench_import(count):
+    user_id = create_user(f"benchmark_import_{count}_{time.time_ns()}")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "tasks.csv")
+            with open(source, "w", newline="", encoding="utf-8") as target:
+                target.write("title,due_date,priority,comments,status\n")
+                for title, due_date, priority, comments, status in generate_rows(count):
+                    target.write(f"{title},{due_date.isoformat()},{priority},{comments},{status}\n")
+
+            task_manager = TaskManager(user_id)
+            task_manager.load_all()
+            start = time.perf_counter()
+            imported = import_tasks(task_manager, source)
+            import_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            exported = export_tasks(task_manager, os.path.join(directory, "export.json"))
+            export_elapsed = time.perf_counter() - start
+
+        single = min(count, 1000)
+        today = datetime.today()
+        start = time.perf_counter()
+        for i in range(single):
+            task_manager.add_task(Task(None, f"Single {i}", today, "Normal", "", "Pending"))
+        single_elapsed = time.perf_counter() - start
+    finally:
+        delete_user(user_id)
+
+    print(f"import: {imported:>7} tasks in {import_elapsed * 1000:9.1f} ms ({imported / import_elapsed:,.0f} tasks/s), "
+          f"export {exported} in {export_elapsed * 1000:.1f} ms ({exported / export_elapsed:,.0f} tasks/s), "
+          f"add_task one by one {single / single_elapsed:,.0f} tasks/s")
+
+
+def generate_tasks(count):
+    return [Task(i, title, datetime.combine(due_date, datetime.min.time()), priority, comments, status)
+            for i, (title, due_date, priority, comments, status) in enumerate(generate_rows(count), 1)]
+
+
+def time_ui(root, action):
+    start = time.perf_counter()
+    action()
+    root.update()
+    return time.perf_counter() - start
+
+
+def bench_table(count):
+    tasks = generate_tasks(count)
+    values = lambda task: (task.title, task.due_date.strftime('%Y-%m-%d'), task.priority, task.comments, task.status)
+    columns = ("Task Name", "Due Date", "Priority", "Comments", "Status")
+
+    root = tk.Tk()
+    root.geometry("1000x600")
+    try:
+        tables = []
+
+        def open_virtual():
+            for _ in range(3):
+                table = VirtualTable(root, columns, values)
+                table.pack(fill="both", expand=True)
+                table.set_rows(tasks)
+                tables.append(table)
+
+        virtual_open = time_ui(root, open_virtual)
+        virtual_refresh = time_ui(root, lambda: [table.set_rows(tasks) for table in tables])
+        for table in tables:
+            table.destroy()
+
+        trees = []
+
+        def open_plain():
+            for _ in range(3):
+                tree = ttk.Treeview(root, columns=columns, show="headings")
+                tree.pack(fill="both", expand=True)
+                for task in tasks:
+                    tree.insert("", "end", values=values(task))
+                trees.append(tree)
+
+        def refresh_plain():
+            for tree in trees:
+                tree.delete(*tree.get_children())
+                for task in tasks:
+                    tree.insert("", "end", values=values(task))
+
+        plain_open = time_ui(root, open_plain)
+        plain_refresh = time_ui(root, refresh_plain)
+    finally:
+        root.destroy()
+
+    print(f"table: {count:>7} tasks x 3 tabs: virtual open {virtual_open * 1000:8.1f} ms, refresh {virtual_refresh * 1000:8.1f} ms | "
+          f"plain Treeview open {plain_open * 1000:9.1f} ms, refresh {plain_refresh * 1000:9.1f} ms")
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    objects = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objects, size / len(objects)
+
+
+def time_sort(tasks, sort):
+    best = float("inf")
+    for _ in range(3):
+        rows = list(tasks)
+        start = time.perf_counter()
+        sort(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+SORT_CRITERIA = ([("due_date", False)], [("priority", True)], [("status", False), ("due_date", True)],
+                 [("priority", True), ("status", False), ("title", False)])
+
+
+def legacy_sort(rows, criteria):
+    keys = {"title": lambda task: task.title, "due_date": lambda task: task.due_date,
+            "priority": lambda task: PRIORITIES.index(task.priority), "status": lambda task: STATUSES.index(task.status)}
+    for field, descending in reversed(criteria):
+        rows.sort(key=keys[field], reverse=descending)
+
+
+def bench_sort(count):
+    rows = generate_rows(count)
+    tasks, task_size = measure_memory(lambda: [Task(i, title, datetime.combine(due_date, datetime.min.time()), priority, comments, status)
+                                               for i, (title, due_date, priority, comments, status) in enumerate(rows, 1)])
+    plain, plain_size = measure_memory(lambda: [SimpleNamespace(id=i, title=title, due_date=datetime.combine(due_date, datetime.min.time()),
+                                                                priority=priority, comments=comments, status=status)
+                                                for i, (title, due_date, priority, comments, status) in enumerate(rows, 1)])
+
+    print(f"sort: {count:>7} tasks, memory per task: Task {task_size:6.0f} B, plain object {plain_size:6.0f} B")
+    for criteria in SORT_CRITERIA:
+        label = ", ".join(f"{field}{' desc' if descending else ''}" for field, descending in criteria)
+        ranked = time_sort(tasks, lambda rows: sort_tasks(rows, criteria))
+        legacy = time_sort(plain, lambda rows: legacy_sort(rows, criteria))
+        print(f"      {label:<36} ranked {ranked * 1000:8.1f} ms, tuple.index {legacy * 1000:8.1f} ms")
+
+
+STARTUP_RUNS = 5
+
+
+def measure_startup():
+    imports = {}
+    wall_times = []
+    for _ in range(STARTUP_RUNS):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+        wall_times.append(time.perf_counter() - start)
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+                _, cumulative, module = line.split("|")
+                imports[module.strip()] = min(imports.get(module.strip(), float("inf")), int(cumulative) / 1000)
+    return min(wall_times), imports
+
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def bench_startup(history_path):
+    wall_time, imports = measure_startup()
+    slowest = sorted(((ms, module) for module, ms in imports.items() if module != "app"), reverse=True)[:5]
+    entry = {"commit": git_commit(), "date": datetime.now().isoformat(timespec="seconds"),
+             "process_ms": round(wall_time * 1000, 1), "import_app_ms": imports.get("app"),
+             "slowest_imports_ms": {module: ms for ms, module in slowest}}
+
+    previous = None
+    if os.path.exists(history_path):
+        with open(history_path, encoding="utf-8") as history:
+            lines = [line for line in history if line.strip()]
+        previous = json.loads(lines[-1]) if lines else None
+    with open(history_path, "a", encoding="utf-8") as history:
+        history.write(json.dumps(entry) + "\n")
+
+    print(f"startup: import app {entry['import_app_ms']:.1f} ms, process {entry['process_ms']:.1f} ms (best of {STARTUP_RUNS})")
+    if previous:
+        print(f"         previous {previous['import_app_ms']:.1f} ms at {previous['commit']} ({previous['date']})")
+    for ms, module in slowest:
+        print(f"         {module:<30} {ms:8.1f} ms")
+
+
+def run_session(backend, session):
+    with backend.cursor(commit=True) as cursor:
+        cursor.execute("INSERT INTO users (username) VALUES (%s)", (f"session_{session}",))
+        user_id = cursor.lastrowid
+
+    task_manager = TaskManager(user_id, backend)
+    today = datetime.today()
+    for i in range(20):
+        task_manager.add_task(Task(None, f"Task {i}", today + timedelta(days=i), PRIORITIES[i % 3], "", STATUSES[i % 3]))
+    tasks = task_manager.load_all()
+    task_manager.get_completed_tasks_count()
+    return len(tasks)
+
+
+def bench_stress(sessions):
+    with tempfile.TemporaryDirectory() as directory:
+        backend = SQLiteBackend(os.path.join(directory, "stress.db"))
+        apply_migrations(backend)
+        workers = POOL_SIZE * 4
+        errors = []
+        lock = threading.Lock()
+
+        def session_or_error(session):
+            try:
+                return run_session(backend, session)
+            except Exception as error:
+                with lock:
+                    errors.append(error)
+                return 0
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            rows = sum(executor.map(session_or_error, range(sessions)))
+        elapsed = time.perf_counter() - start
+        backend.close()
+
+    print(f"stress: {sessions:>5} sessions on {workers} threads, pool of {POOL_SIZE}: {elapsed * 1000:9.1f} ms "
+          f"({sessions / elapsed:,.0f} sessions/s, {rows} rows read, {len(errors)} errors)")
+
+
+SERVER_USERS = 20
+SERVER_TASKS_PER_USER = 2000
+SERVER_DURATION = 10
+
+
+async def http_request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    response = await reader.readexactly(length) if length else b""
+    return status, json.loads(response) if response else None
+
+
+async def run_client(port, client, user_ids, deadline, latencies, failures):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    user_id = user_ids[client % len(user_ids)]
+    request = 0
+    try:
+        while time.perf_counter() < deadline:
+            request += 1
+            kind = request % 10
+            if kind < 6:
+                call = ("GET", f"/users/{user_id}/tasks?page={request % 20 + 1}&per_page=50")
+            elif kind < 7:
+                call = ("GET", f"/users/{user_id}/tasks?q={WORDS[request % 10]}&per_page=50")
+            elif kind < 8:
+                call = ("GET", f"/users/{user_id}/statistics")
+            elif kind < 9:
+                call = ("POST", f"/users/{user_id}/tasks", {"title": f"Client {client} request {request}",
+                                                             "due_date": date.today().isoformat(), "priority": "High"})
+            else:
+                call = ("PUT", f"/users/{user_id}/tasks/{user_id * SERVER_TASKS_PER_USER}",
+                        {"title": f"Updated {user_id}", "due_date": date.today().isoformat(), "status": STATUSES[request % 3]})
+            start = time.perf_counter()
+            status, _ = await http_request(reader, writer, *call)
+            latencies.append(time.perf_counter() - start)
+            if status >= 500:
+                failures.append(status)
+    finally:
+        writer.close()
+
+
+async def load_server(port, clients, user_ids):
+    latencies, failures = [], []
+    start = time.perf_counter()
+    deadline = start + SERVER_DURATION
+    await asyncio.gather(*(run_client(port, client, user_ids, deadline, latencies, failures) for client in range(clients)))
+    return time.perf_counter() - start, latencies, failures
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_server(client_counts):
+    with tempfile.TemporaryDirectory() as directory:
+        backend = SQLiteBackend(os.path.join(directory, "server.db"))
+        apply_migrations(backend)
+        user_ids = []
+        rows = generate_rows(SERVER_TASKS_PER_USER)
+        with backend.cursor(commit=True) as cursor:
+            for user in range(SERVER_USERS):
+                cursor.execute("INSERT INTO users (username) VALUES (%s)", (f"server_{user}",))
+                user_ids.append(cursor.lastrowid)
+                cursor.executemany("INSERT INTO tasks (user_id, title, due_date, priority, comments, status) VALUES (%s, %s, %s, %s, %s, %s)",
+                                   [(cursor.lastrowid, *row) for row in rows])
+
+        for clients in client_counts:
+            server = TaskServer(TaskService(backend))
+
+            async def run():
+                listener = await server.start("127.0.0.1", 0)
+                port = listener.sockets[0].getsockname()[1]
+                async with listener:
+                    return await load_server(port, clients, user_ids)
+
+            elapsed, latencies, failures = asyncio.run(run())
+            server.shutdown()
+            print(f"server: {clients:>4} clients, {SERVER_USERS} users x {SERVER_TASKS_PER_USER} tasks: "
+                  f"{len(latencies) / elapsed:8,.0f} requests/s, p50 {percentile(latencies, 0.5) * 1000:7.2f} ms, "
+                  f"p99 {percentile(latencies, 0.99) * 1000:7.2f} ms ({len(latencies)} requests, {len(failures)} server errors)")
+        backend.close()
+
+
+SUITE_HISTORY = "benchmark_history.jsonl"
+SUITE_REPEATS = 5
+SUITE_OTHER_USERS = 2
+
+
+class CountingBackend(SQLiteBackend):
+    """SQLite backend that counts the statements it runs; every execute goes through sql()."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.query_count = 0
+
+    def sql(self, query):
+        self.query_count += 1
+        return super().sql(query)
+
+
+def seed_user(backend, username, count, seed):
+    with backend.cursor(commit=True) as cursor:
+        cursor.execute("INSERT INTO users (username) VALUES (%s)", (username,))
+        user_id = cursor.lastrowid
+        cursor.executemany("INSERT INTO tasks (user_id, title, due_date, priority, comments, status) VALUES (%s, %s, %s, %s, %s, %s)",
+                           [(user_id, *row) for row in generate_rows(count, seed)])
+    return user_id
+
+
+def measure(backend, operation, repeats=SUITE_REPEATS, setup=None):
+    timings = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        before = backend.query_count
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+        queries = backend.query_count - before
+    return {"ms": round(median(timings) * 1000, 3), "queries": queries}
+
+
+def run_suite(backend, user_id, count):
+    task_manager = TaskManager(user_id, backend)
+    results = {"load_tasks": measure(backend, task_manager.load_all, repeats=3)}
+    tasks = list(task_manager.tasks.values())
+    today = date.today().isoformat()
+
+    def clear_cache():
+        task_manager.query_cache.clear()
+
+    def clear_statistics():
+        task_manager.statistics = None
+        task_manager.weekly_completions = None
+
+    results["filter_tasks"] = measure(backend, lambda: task_manager.filter_tasks("invoice"), setup=clear_cache)
+    results["filter_tasks_cached"] = measure(backend, lambda: task_manager.filter_tasks("invoice"))
+    results["filter_by_status"] = measure(backend, lambda: task_manager.filter_tasks_by_status("Pending"), setup=clear_cache)
+    results["filter_by_priority"] = measure(backend, lambda: task_manager.filter_tasks_by_priority("High"), setup=clear_cache)
+    results["filter_by_due_date"] = measure(backend, lambda: task_manager.filter_tasks_by_due_date(today), setup=clear_cache)
+    results["partition_tabs"] = measure(backend, lambda: [task_manager.tasks_in_bucket(bucket) for bucket in BUCKETS])
+    results["sort_tasks"] = measure(backend, lambda: sort_tasks(list(tasks), [("due_date", False)]))
+    results["sort_tasks_multi"] = measure(backend, lambda: sort_tasks(list(tasks), [("priority", True), ("status", False), ("title", False)]))
+    results["chart_counts"] = measure(backend, lambda: (task_manager.get_statistics(), task_manager.get_completions_per_week()),
+                                      setup=clear_statistics)
+    results["chart_counts_cached"] = measure(backend, lambda: (task_manager.get_statistics(), task_manager.get_completions_per_week()))
+
+    random_state = random.Random(SEED)
+    added = []
+
+    def add_task():
+        task = Task(None, f"Suite add {len(added)}", datetime.combine(date.today(), datetime.min.time()),
+                    random_state.choice(PRIORITIES), "", random_state.choice(STATUSES))
+        task_manager.add_task(task)
+        added.append(task)
+
+    def add_tasks():
+        start = len(added)
+        batch = [Task(None, f"Suite add {start + i}", datetime.combine(date.today(), datetime.min.time()), "Normal", "", "Pending")
+                 for i in range(100)]
+        added.extend(task_manager.add_tasks(batch))
+
+    def update_task():
+        task = random_state.choice(tasks)
+        task_manager.update_task(Task(task.id, task.title, task.due_date + timedelta(days=1), task.priority, task.comments,
+                                      random_state.choice(STATUSES)))
+
+    results["add_task"] = measure(backend, add_task, repeats=SUITE_REPEATS * 4)
+    results["add_tasks_100"] = measure(backend, add_tasks)
+    results["update_task"] = measure(backend, update_task, repeats=SUITE_REPEATS * 4)
+    results["remove_task"] = measure(backend, lambda: task_manager.remove_task(added.pop()), repeats=SUITE_REPEATS * 4)
+    return results
+
+
+def print_comparison(previous, current):
+    print(f"compare: {previous['commit']} ({previous['date']}) -> {current['commit']} ({current['date']})")
+    for count, operations in current["results"].items():
+        before = previous["results"].get(count)
+        if not before:
+            continue
+        print(f"  {count} tasks")
+        for name, result in operations.items():
+            if name in before and before[name]["ms"]:
+                change = (result["ms"] - before[name]["ms"]) / before[name]["ms"] * 100
+                queries = f"{before[name]['queries']} -> {result['queries']}" if before[name]["queries"] != result["queries"] else ""
+                print(f"    {name:<22} {before[name]['ms']:10.3f} -> {result['ms']:10.3f} ms {change:+7.1f}%  {queries}")
+
+
+def read_history(history_path):
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, encoding="utf-8") as history:
+        return [json.loads(line) for line in history if line.strip()]
+
+
+def bench_suite(counts, history_path=SUITE_HISTORY):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        backend = CountingBackend(os.path.join(directory, "suite.db"))
+        apply_migrations(backend)
+        for count in counts:
+            user_id = seed_user(backend, f"suite_{count}", count, SEED)
+            for other in range(SUITE_OTHER_USERS):
+                seed_user(backend, f"suite_{count}_other_{other}", count // 10, SEED + other + 1)
+
+            results[str(count)] = run_suite(backend, user_id, count)
+            print(f"suite: {count} tasks (seed {SEED})")
+            for name, result in results[str(count)].items():
+                print(f"    {name:<22} {result['ms']:10.3f} ms  {result['queries']:>4} queries")
+        backend.close()
+
+    entry = {"commit": git_commit(), "date": datetime.now().isoformat(timespec="seconds"), "seed": SEED, "results": results}
+    previous = [run for run in read_history(history_path) if run["commit"] != entry["commit"]]
+    with open(history_path, "a", encoding="utf-8") as history:
+        history.write(json.dumps(entry) + "\n")
+    if previous:
+        print_comparison(previous[-1], entry)
+
+
+def bench_compare(commits, history_path=SUITE_HISTORY):
+    runs = read_history(history_path)
+    if commits:
+        runs = [next((run for run in reversed(runs) if run["commit"] == commit), None) for commit in commits]
+        if None in runs:
+            print(f"No run for commit {commits[runs.index(None)]} in {history_path}")
+            return
+    if len(runs) < 2:
+        print(f"Need two runs in {history_path} to compare")
+        return
+    print_comparison(runs[-2], runs[-1])
+
+
+BENCHMARKS = {"load": bench_load, "search": bench_search, "filters": bench_filters}
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "stress":
+        for sessions in [int(arg) for arg in args[1:]] or [50, 200]:
+            bench_stress(sessions)
+        return
+    if args and args[0] == "startup":
+        bench_startup(args[1] if len(args) > 1 else "startup_history.jsonl")
+        return
+    if args and args[0] == "table":
+        for count in [int(arg) for arg in args[1:]] or [1000, 10000, 100000]:
+            bench_table(count)
+        return
+    if args and args[0] == "suite":
+        bench_suite([int(arg) for arg in args[1:]] or [1000, 10000, 100000])
+        return
+    if args and args[0] == "compare":
+        bench_compare(args[1:3])
+        return
+    if args and args[0] == "server":
+        bench_server([int(arg) for arg in args[1:]] or [10, 50])
+        return
+    if args and args[0] == "sort":
+        for count in [int(arg) for arg in args[1:]] or [100000]:
+            bench_sort(count)
+        return
+    if args and args[0] == "import":
+        for count in [int(arg) for arg in args[1:]] or [10000, 100000]:
+            bench_import(count)
+        return
+
+    name = args.pop(0) if args and args[0] in BENCHMARKS else "load"
+    counts = [int(arg) for arg in args] or [1000, 5000, 20000]
+    for count in counts:
+        run_with_user(count, BENCHMARKS[name])
+
+
+if __name__ == "__main__":
+    main()
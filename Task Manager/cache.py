@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 128
+MAX_ROWS = 100000
+
+
+class QueryCache:
+    """LRU cache of query results tagged with the data version they were computed at.
+
+    An entry whose version is older than the caller's current version is a miss and is dropped.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_rows=MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.entries = OrderedDict()
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, result):
+        if len(result) > self.max_rows:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (version, result)
+            self.rows += len(result)
+            while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.rows = 0
+
+    def _drop(self, key):
+        _, result = self.entries.pop(key)
+        self.rows -= len(result)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "evictions": self.evictions,
+                    "entries": len(self.entries), "rows": self.rows,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,44 @@
+import tkinter as tk
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+STATUS_LABELS = ['Completed', 'In Progress', 'Pending']
+STATUS_COLORS = ['lightgreen', 'lightblue', 'lightcoral']
+
+
+class StatisticsPanel(tk.Toplevel):
+    """Window with one reusable figure: task completion pie and completions per week."""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Task Statistics")
+        self.figure = Figure(figsize=(9, 4), dpi=100)
+        self.status_axes = self.figure.add_subplot(1, 2, 1)
+        self.weekly_axes = self.figure.add_subplot(1, 2, 2)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.data = None
+
+    def update_data(self, statistics, weekly_completions):
+        status = statistics["status"]
+        data = (tuple(status[label] for label in STATUS_LABELS), tuple(weekly_completions))
+        if data == self.data:
+            return
+        self.data = data
+
+        sizes, weeks = data
+        self.status_axes.clear()
+        if any(sizes):
+            self.status_axes.pie(sizes, explode=(0.1, 0, 0), labels=STATUS_LABELS, colors=STATUS_COLORS,
+                                 autopct='%1.1f%%', shadow=True, startangle=140)
+        self.status_axes.axis('equal')
+        self.status_axes.set_title('Task Completion Status')
+
+        self.weekly_axes.clear()
+        labels = [week.strftime('%m-%d') for week, _ in weeks]
+        self.weekly_axes.bar(labels, [count for _, count in weeks], color='lightgreen')
+        self.weekly_axes.set_title('Completed per Week')
+        self.weekly_axes.tick_params(axis='x', labelrotation=45, labelsize=8)
+
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
@@ -1,14 +1,322 @@
-import mysql.connector
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
 
-db_connection = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="",
-    database="taskManager"
-)
+DB_CONFIG = {
+    "host": os.environ.get("TASKMANAGER_DB_HOST", "localhost"),
+    "user": os.environ.get("TASKMANAGER_DB_USER", "root"),
+    "password": os.environ.get("TASKMANAGER_DB_PASSWORD", ""),
+    "database": os.environ.get("TASKMANAGER_DB_NAME", "taskManager"),
+}
+POOL_SIZE = int(os.environ.get("TASKMANAGER_DB_POOL_SIZE", "5"))
+POOL_TIMEOUT = 30
+PROFILE = os.environ.get("TASKMANAGER_PROFILE", "") not in ("", "0")
+PROFILE_OUTPUT = os.environ.get("TASKMANAGER_PROFILE_OUTPUT")
+SLOW_QUERY_MS = float(os.environ.get("TASKMANAGER_SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("TASKMANAGER_N_PLUS_ONE", "10"))
+INTERNAL_MODULES = ("database", "storage", "contextlib")
+IN_LIST = re.compile(r"IN \((?:\s*(?:%s|\?)\s*,?)+\)")
+WHITESPACE = re.compile(r"\s+")
 
-cursor = db_connection.cursor()
+logger = logging.getLogger("taskmanager.queries")
 
-def close_connection():
-    cursor.close()
-    db_connection.close()
+
+def connect_mysql():
+    import mysql.connector
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+def is_alive(connection):
+    try:
+        if hasattr(connection, "ping"):
+            connection.ping(reconnect=True, attempts=2)
+        else:
+            connection.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return self.connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def acquire(self):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._open()
+            if connection is None:
+                try:
+                    connection = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No database connection available after {self.timeout} seconds")
+            else:
+                return connection
+
+        if not is_alive(connection):
+            self.discard(connection)
+            return self.acquire()
+        return connection
+
+    def release(self, connection):
+        self._idle.put(connection)
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        except BaseException:
+            try:
+                connection.rollback()
+            except Exception:
+                self.discard(connection)
+                raise
+            self.release(connection)
+            raise
+
+        # A connection handed back without commit() (a read-only checkout) can still hold an open transaction.
+        # On MySQL that keeps its REPEATABLE READ snapshot, and the next caller to get it would not see newer rows.
+        if connection.in_transaction:
+            try:
+                connection.rollback()
+            except Exception:
+                self.discard(connection)
+                return
+        self.release(connection)
+
+    def close_all(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(connection)
+
+
+def normalize_statement(query):
+    return IN_LIST.sub("IN (...)", WHITESPACE.sub(" ", query).strip())
+
+
+def find_origin(frame):
+    while frame is not None and frame.f_globals.get("__name__") in INTERNAL_MODULES:
+        frame = frame.f_back
+    while frame is not None and frame.f_code.co_name.startswith("_") and not frame.f_code.co_name.startswith("__") \
+            and frame.f_back is not None:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    owner = frame.f_locals.get("self")
+    scope = type(owner).__name__ if owner is not None else frame.f_globals.get("__name__")
+    return f"{scope}.{frame.f_code.co_name}"
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def add(self, ms, rows):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+
+
+class InstrumentedCursor:
+    """Times each statement from execute until the next statement or close, so fetch time is included."""
+
+    def __init__(self, profiler, cursor):
+        self.profiler = profiler
+        self.cursor = cursor
+        self.current = None
+
+    def execute(self, query, params=()):
+        return self._run(self.cursor.execute, query, params, many=False)
+
+    def executemany(self, query, rows):
+        return self._run(self.cursor.executemany, query, rows, many=True)
+
+    def _run(self, method, query, params, many):
+        self._finish()
+        origin = find_origin(sys._getframe(2))
+        self.current = [query, origin, many, 0.0, 0]
+        start = time.perf_counter()
+        try:
+            return method(query, params)
+        finally:
+            self.current[3] += time.perf_counter() - start
+            if query.lstrip()[:6].upper() != "SELECT":
+                self.current[4] = max(self.cursor.rowcount, 0)
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        rows = method(*args)
+        if self.current:
+            self.current[3] += time.perf_counter() - start
+            self.current[4] += (rows is not None) if method == self.cursor.fetchone else len(rows)
+        return rows
+
+    def _finish(self):
+        if self.current:
+            self.profiler.record(*self.current)
+            self.current = None
+
+    def fetchone(self):
+        return self._fetch(self.cursor.fetchone)
+
+    def fetchmany(self, size):
+        return self._fetch(self.cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self.cursor.fetchall)
+
+    def close(self):
+        self._finish()
+        self.cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class QueryProfiler:
+    """Records timing and row counts per (action, originating method, statement).
+
+    The action is the UI or API operation a statement runs under (see action() and run_as()); without one,
+    the originating method is used. Slow statements and statements repeated within one action (N+1) are
+    logged on the taskmanager.queries logger as they happen; N+1 detection only runs inside an action.
+    """
+
+    def __init__(self, enabled=PROFILE, slow_query_ms=SLOW_QUERY_MS, n_plus_one=N_PLUS_ONE_THRESHOLD):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one = n_plus_one
+        self.stats = {}
+        self.flagged = set()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def wrap(self, cursor):
+        return InstrumentedCursor(self, cursor)
+
+    @contextmanager
+    def action(self, name):
+        previous = getattr(self.local, "action", None), getattr(self.local, "run", None)
+        self.local.action, self.local.run = name, object()
+        try:
+            yield
+        finally:
+            self.local.action, self.local.run = previous
+
+    def run_as(self, name, function, *args):
+        with self.action(name):
+            return function(*args)
+
+    def caller(self, depth=1):
+        return find_origin(sys._getframe(depth + 1))
+
+    def record(self, query, origin, many, elapsed, rows):
+        action = getattr(self.local, "action", None) or origin
+        statement = normalize_statement(query)
+        ms = elapsed * 1000
+        with self.lock:
+            stats = self.stats.get((action, origin, statement))
+            if stats is None:
+                stats = self.stats[(action, origin, statement)] = QueryStats()
+            stats.add(ms, rows)
+
+        if ms >= self.slow_query_ms:
+            logger.warning("Slow query: %.1f ms from %s in %s: %s", ms, origin, action, statement)
+        run = getattr(self.local, "run", None)
+        if run is not None and not many:
+            self._check_repeats(run, action, origin, statement)
+
+    def _check_repeats(self, scope, action, origin, statement):
+        if getattr(self.local, "scope", None) != scope:
+            self.local.scope = scope
+            self.local.repeats = Counter()
+        self.local.repeats[statement] += 1
+        if self.local.repeats[statement] == self.n_plus_one:
+            with self.lock:
+                self.flagged.add((action, origin, statement))
+            logger.warning("Possible N+1: statement ran %d times from %s in %s: %s", self.n_plus_one, origin, action, statement)
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.flagged.clear()
+
+    def summary(self):
+        with self.lock:
+            rows = [{"action": action, "origin": origin, "statement": statement, "count": stats.count,
+                     "total_ms": round(stats.total_ms, 3), "avg_ms": round(stats.total_ms / stats.count, 3),
+                     "max_ms": round(stats.max_ms, 3), "rows": stats.rows,
+                     "n_plus_one": (action, origin, statement) in self.flagged}
+                    for (action, origin, statement), stats in self.stats.items()]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def report(self, limit=20):
+        lines = [f"{'total ms':>10} {'count':>6} {'avg ms':>8} {'max ms':>8} {'rows':>8}  action / origin / statement"]
+        for row in self.summary()[:limit]:
+            flag = "  [N+1]" if row["n_plus_one"] else ""
+            lines.append(f"{row['total_ms']:10.1f} {row['count']:6} {row['avg_ms']:8.2f} {row['max_ms']:8.2f} {row['rows']:8}  "
+                         f"{row['action']} / {row['origin']}{flag}")
+            lines.append(f"{'':45}{row['statement'][:120]}")
+        return "\n".join(lines)
+
+    def dump(self, target=None):
+        """Writes the summary to stderr (None), the taskmanager.queries logger ("log"), or a .json or text file."""
+        if not self.stats:
+            return
+        if target is None:
+            print(self.report(), file=sys.stderr)
+        elif target == "log":
+            for line in self.report().splitlines():
+                logger.info(line)
+        else:
+            with open(target, "w", encoding="utf-8") as output:
+                if target.endswith(".json"):
+                    json.dump(self.summary(), output, indent=2)
+                else:
+                    output.write(self.report(limit=None) + "\n")
+
+
+PROFILER = QueryProfiler()
+if PROFILER.enabled:
+    atexit.register(PROFILER.dump, PROFILE_OUTPUT)
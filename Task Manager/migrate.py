@@ -0,0 +1,120 @@
+"""
+Program: migrate.py
+Applies the versioned SQL files in migrations/<backend> to the configured storage backend
+(the local replica applies migrations/sqlite followed by migrations/replica).
+Each file is named <version>_<description>.sql and is applied once, in version order;
+applied versions are recorded in the schema_migrations table.
+MySQL commits every DDL statement implicitly, so a file cannot be applied atomically. Each statement is
+therefore committed on its own and counted in schema_migration_progress. If a migration fails half way,
+fix the cause (for example remove duplicate task titles before the unique title index) and run it again:
+it resumes after the last statement that succeeded.
+Usage: python migrate.py            apply pending migrations
+       python migrate.py --explain  check that the hot task queries use an index
+"""
+
+import os
+import sqlite3
+import sys
+from storage import get_backend
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+HOT_QUERIES = [
+    ("load tasks", "SELECT id FROM tasks WHERE user_id = %s ORDER BY due_date, id", (0,)),
+    ("task page after key", "SELECT id FROM tasks WHERE user_id = %s AND (due_date > %s OR (due_date = %s AND id > %s)) "
+                            "ORDER BY due_date, id LIMIT 100", (0, "2024-01-01", "2024-01-01", 0)),
+    ("filter by status", "SELECT id FROM tasks WHERE status = %s AND user_id = %s", ("Pending", 0)),
+    ("filter by priority", "SELECT id FROM tasks WHERE priority = %s AND user_id = %s", ("High", 0)),
+    ("filter by due date", "SELECT id FROM tasks WHERE due_date = %s AND user_id = %s", ("2024-01-01", 0)),
+    ("duplicate title check", "SELECT id FROM tasks WHERE title = %s AND user_id = %s", ("title", 0)),
+    ("changes since", "SELECT id FROM tasks WHERE user_id = %s AND updated_at >= %s", (0, "2024-01-01 00:00:00")),
+    ("count by status", "SELECT COUNT(*) FROM tasks WHERE status = %s AND user_id = %s", ("Completed", 0)),
+]
+
+
+def get_migrations(backend):
+    migrations = []
+    for directory in getattr(backend, "migration_dirs", (backend.name,)):
+        for filename in sorted(os.listdir(os.path.join(MIGRATIONS_DIR, directory))):
+            if filename.endswith(".sql"):
+                version = int(filename.split("_", 1)[0])
+                migrations.append((version, directory, filename))
+    return sorted(migrations)
+
+
+def split_statements(script):
+    statements = []
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n;"):
+                statements.append(statement.strip().rstrip(";"))
+            statement = ""
+    if statement.strip(" \n;"):
+        statements.append(statement.strip().rstrip(";"))
+    return statements
+
+
+def get_applied_versions(cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS schema_migrations ("
+                   "version INT PRIMARY KEY, "
+                   "name VARCHAR(255) NOT NULL, "
+                   "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def get_progress(cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS schema_migration_progress ("
+                   "version INT PRIMARY KEY, "
+                   "statements INT NOT NULL)")
+    cursor.execute("SELECT version, statements FROM schema_migration_progress")
+    return dict(cursor.fetchall())
+
+
+def apply_migrations(backend=None):
+    backend = backend or get_backend()
+    with backend.cursor(commit=True) as cursor:
+        applied = get_applied_versions(cursor)
+        progress = get_progress(cursor)
+
+    for version, directory, filename in get_migrations(backend):
+        if version in applied:
+            continue
+
+        with open(os.path.join(MIGRATIONS_DIR, directory, filename)) as migration_file:
+            statements = split_statements(migration_file.read())
+        done = progress.get(version, 0)
+        if done:
+            print(f"Resuming migration {filename} after statement {done} of {len(statements)}")
+        for number, statement in enumerate(statements[done:], done + 1):
+            with backend.cursor(commit=True) as cursor:
+                cursor.execute(statement)
+                cursor.execute("DELETE FROM schema_migration_progress WHERE version = %s", (version,))
+                cursor.execute("INSERT INTO schema_migration_progress (version, statements) VALUES (%s, %s)", (version, number))
+        with backend.cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM schema_migration_progress WHERE version = %s", (version,))
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, filename))
+        print(f"Applied migration {filename}")
+
+
+def explain_hot_queries(backend=None):
+    backend = backend or get_backend()
+    unindexed = []
+    for name, query, params in HOT_QUERIES:
+        with backend.cursor() as cursor:
+            key, detail = backend.explain(cursor, query, params)
+        print(f"{name:<22} key={key} {detail}")
+        if not key:
+            unindexed.append(name)
+    return unindexed
+
+
+if __name__ == "__main__":
+    apply_migrations()
+    if "--explain" in sys.argv[1:]:
+        unindexed = explain_hot_queries()
+        if unindexed:
+            print("Queries without an index: " + ", ".join(unindexed))
+            sys.exit(1)
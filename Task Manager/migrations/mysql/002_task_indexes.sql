@@ -0,0 +1,5 @@
+ALTER TABLE tasks
+    ADD INDEX idx_tasks_user_status (user_id, status),
+    ADD INDEX idx_tasks_user_priority (user_id, priority),
+    ADD INDEX idx_tasks_user_due_date (user_id, due_date),
+    ADD UNIQUE INDEX uq_tasks_user_title (user_id, title);
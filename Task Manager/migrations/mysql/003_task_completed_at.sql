@@ -0,0 +1,5 @@
+ALTER TABLE tasks
+    ADD COLUMN completed_at DATETIME NULL,
+    ADD INDEX idx_tasks_user_completed_at (user_id, completed_at);
+
+UPDATE tasks SET completed_at = due_date WHERE status = 'Completed';
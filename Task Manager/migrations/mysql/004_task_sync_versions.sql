@@ -0,0 +1,11 @@
+ALTER TABLE tasks
+    ADD COLUMN version INT NOT NULL DEFAULT 1,
+    ADD COLUMN updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ADD INDEX idx_tasks_user_updated_at (user_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS task_deletions (
+    task_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    deleted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_task_deletions_user_deleted_at (user_id, deleted_at)
+);
@@ -0,0 +1,66 @@
+ALTER TABLE tasks ADD COLUMN remote_id INTEGER;
+
+ALTER TABLE tasks ADD COLUMN base_version INTEGER;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_tasks_remote_id ON tasks (remote_id);
+
+CREATE TABLE IF NOT EXISTS replica_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    applying INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO replica_state (id, applying) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    user_id INTEGER PRIMARY KEY,
+    pulled_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    operation TEXT NOT NULL CHECK (operation IN ('insert', 'update', 'delete')),
+    remote_id INTEGER,
+    base_version INTEGER,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_user ON outbox (user_id, id);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_task ON outbox (task_id);
+
+CREATE TABLE IF NOT EXISTS sync_conflicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    task_id INTEGER,
+    remote_id INTEGER,
+    operation TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    local_title VARCHAR(255),
+    local_due_date DATE,
+    local_priority TEXT,
+    local_comments TEXT,
+    local_status TEXT,
+    detected_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS outbox_task_insert AFTER INSERT ON tasks
+WHEN (SELECT applying FROM replica_state WHERE id = 1) = 0
+BEGIN
+    INSERT INTO outbox (task_id, user_id, operation) VALUES (NEW.id, NEW.user_id, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS outbox_task_update AFTER UPDATE OF title, due_date, priority, comments, status ON tasks
+WHEN (SELECT applying FROM replica_state WHERE id = 1) = 0
+BEGIN
+    INSERT INTO outbox (task_id, user_id, operation, remote_id, base_version)
+    VALUES (NEW.id, NEW.user_id, 'update', OLD.remote_id, OLD.base_version);
+END;
+
+CREATE TRIGGER IF NOT EXISTS outbox_task_delete AFTER DELETE ON tasks
+WHEN (SELECT applying FROM replica_state WHERE id = 1) = 0
+BEGIN
+    INSERT INTO outbox (task_id, user_id, operation, remote_id, base_version)
+    VALUES (OLD.id, OLD.user_id, 'delete', OLD.remote_id, OLD.base_version);
+END;
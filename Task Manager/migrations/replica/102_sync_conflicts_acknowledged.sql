@@ -0,0 +1,3 @@
+ALTER TABLE sync_conflicts ADD COLUMN acknowledged_at DATETIME;
+
+CREATE INDEX IF NOT EXISTS idx_sync_conflicts_user_open ON sync_conflicts (user_id, acknowledged_at);
@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(255) UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    title VARCHAR(255),
+    due_date DATE,
+    priority TEXT CHECK (priority IN ('Normal', 'Medium', 'High')),
+    comments TEXT,
+    status TEXT CHECK (status IN ('Pending', 'In Progress', 'Completed')),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
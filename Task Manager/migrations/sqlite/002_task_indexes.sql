@@ -0,0 +1,4 @@
+CREATE INDEX IF NOT EXISTS idx_tasks_user_status ON tasks (user_id, status);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_priority ON tasks (user_id, priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_due_date ON tasks (user_id, due_date);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_tasks_user_title ON tasks (user_id, title);
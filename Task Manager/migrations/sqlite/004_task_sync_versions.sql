@@ -0,0 +1,20 @@
+ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+
+ALTER TABLE tasks ADD COLUMN updated_at DATETIME;
+
+UPDATE tasks SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_user_updated_at ON tasks (user_id, updated_at);
+
+CREATE TRIGGER IF NOT EXISTS tasks_default_updated_at AFTER INSERT ON tasks WHEN NEW.updated_at IS NULL
+BEGIN
+    UPDATE tasks SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS task_deletions (
+    task_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    deleted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_task_deletions_user_deleted_at ON task_deletions (user_id, deleted_at);
@@ -0,0 +1 @@
+CREATE UNIQUE INDEX IF NOT EXISTS uq_tasks_user_title_nocase ON tasks (user_id, title COLLATE NOCASE);
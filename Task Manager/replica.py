@@ -0,0 +1,381 @@
+"""
+Program: replica.py
+Keeps the local SQLite replica (TASKMANAGER_BACKEND=replica) in sync with the remote backend.
+All reads and writes go to the replica; triggers queue every local change in the outbox table, and
+ReplicaSync pushes the outbox and pulls remote changes in a background thread whenever the server is reachable.
+Remote rows carry a version and an updated_at timestamp: pushes only apply if the remote version still matches
+the one the local copy was based on, and pulls fetch rows changed since the last pull. On a conflict the
+server wins and the local copy is kept in the sync_conflicts table until the user dismisses it.
+Usage: python replica.py <user_id>              run one sync for the user and print its status
+       python replica.py <user_id> conflicts    list the conflicts that have not been dismissed
+       python replica.py <user_id> dismiss      dismiss all of them
+"""
+
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from migrate import apply_migrations
+from storage import get_backend, is_integrity_error
+
+SYNC_INTERVAL = float(os.environ.get("TASKMANAGER_SYNC_INTERVAL", 30))
+SYNC_OVERLAP_SECONDS = 5
+TASK_FIELDS = ("title", "due_date", "priority", "comments", "status", "completed_at")
+CONFLICT_FIELDS = ("id", "task_id", "operation", "reason", "local_title", "local_due_date", "local_priority",
+                   "local_comments", "local_status", "detected_at")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+logger = logging.getLogger("taskmanager.replica")
+
+
+def _timestamp(value):
+    return None if value is None else str(value)[:19]
+
+
+@contextmanager
+def applying(backend):
+    """Local write transaction whose changes are not queued in the outbox (they came from the server)."""
+    with backend.cursor() as cursor:
+        try:
+            cursor.execute("UPDATE replica_state SET applying = 1 WHERE id = 1")
+            yield cursor
+            cursor.execute("UPDATE replica_state SET applying = 0 WHERE id = 1")
+            cursor.connection.commit()
+        except BaseException:
+            cursor.connection.rollback()
+            raise
+
+
+def prepare_replica(backend):
+    """Migrates the remote schema and mirrors its users; an unreachable server is left for the next sync."""
+    try:
+        apply_migrations(backend.remote)
+        with backend.remote.cursor() as cursor:
+            cursor.execute("SELECT id, username FROM users")
+            remote_users = cursor.fetchall()
+    except Exception as error:
+        logger.warning("Replica server unavailable, working offline: %s", error)
+        return False
+
+    with backend.cursor(commit=True) as cursor:
+        cursor.executemany("INSERT OR IGNORE INTO users (id, username) VALUES (%s, %s)", remote_users)
+    return True
+
+
+class ReplicaSync:
+    """Pushes the outbox of one user to the remote backend and pulls the remote changes back.
+
+    on_change(task_ids) receives the local ids of tasks the sync inserted, changed or deleted, and
+    on_status(status) the state after each attempt; both are called on the sync thread.
+    """
+
+    def __init__(self, backend, user_id, interval=SYNC_INTERVAL, on_change=None, on_status=None):
+        self.backend = backend
+        self.remote = backend.remote
+        self.user_id = user_id
+        self.interval = interval
+        self.on_change = on_change
+        self.on_status = on_status
+        self.online = None
+        self.synced_at = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+        self.thread.start()
+
+    def request(self):
+        self.wake.set()
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval)
+
+    def _run(self):
+        woken = False
+        while not self.stopping.is_set():
+            # A wake-up after a local change only needs a round trip if something is queued.
+            if not woken or self.pending_count():
+                self.sync()
+            woken = self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def sync(self):
+        changed = set()
+        with self.lock:
+            try:
+                self.push(changed)
+                self.pull(changed)
+            except Exception as error:
+                if self.online is not False:
+                    logger.warning("Replica sync failed, working offline: %s", error)
+                self.online = False
+            else:
+                self.online = True
+                self.synced_at = datetime.now()
+            finally:
+                if changed and self.on_change:
+                    self.on_change(changed)
+        if self.on_status:
+            self.on_status(self.status())
+        return self.online
+
+    def status(self):
+        with self.backend.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sync_conflicts WHERE user_id = %s AND acknowledged_at IS NULL", (self.user_id,))
+            conflicts = cursor.fetchone()[0]
+        return {"online": self.online, "pending": self.pending_count(), "conflicts": conflicts, "synced_at": self.synced_at}
+
+    def conflicts(self):
+        """Conflicts the user has not dismissed yet, newest first, with the local copy that lost."""
+        with self.backend.cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(CONFLICT_FIELDS)} FROM sync_conflicts "
+                           "WHERE user_id = %s AND acknowledged_at IS NULL ORDER BY id DESC", (self.user_id,))
+            return [dict(zip(CONFLICT_FIELDS, row)) for row in cursor.fetchall()]
+
+    def dismiss_conflicts(self, conflict_ids=None):
+        """Marks the given conflicts (all open ones if None) as seen; they are kept for reference."""
+        with self.backend.cursor(commit=True) as cursor:
+            if conflict_ids is None:
+                cursor.execute("UPDATE sync_conflicts SET acknowledged_at = CURRENT_TIMESTAMP "
+                               "WHERE user_id = %s AND acknowledged_at IS NULL", (self.user_id,))
+            else:
+                cursor.executemany("UPDATE sync_conflicts SET acknowledged_at = CURRENT_TIMESTAMP WHERE id = %s AND user_id = %s",
+                                   [(conflict_id, self.user_id) for conflict_id in conflict_ids])
+        return self.status()
+
+    def pending_count(self):
+        with self.backend.cursor() as cursor:
+            cursor.execute("SELECT COUNT(DISTINCT task_id) FROM outbox WHERE user_id = %s", (self.user_id,))
+            return cursor.fetchone()[0]
+
+    def push(self, changed):
+        with self.backend.cursor() as cursor:
+            cursor.execute("SELECT id, task_id, operation, remote_id, base_version FROM outbox WHERE user_id = %s ORDER BY id",
+                           (self.user_id,))
+            entries = cursor.fetchall()
+
+        if not entries:
+            return
+        last_entries = {task_id: (remote_id, base_version) for _, task_id, _, remote_id, base_version in entries}
+        for task_id, (remote_id, base_version) in last_entries.items():
+            self._push_task(task_id, remote_id, base_version, entries[-1][0], changed)
+
+    def _push_task(self, task_id, remote_id, base_version, last_entry_id, changed):
+        local = self._local_task(task_id)
+        if local is not None:
+            remote_id, base_version = local["remote_id"], local["base_version"]
+
+        if local is None and remote_id is None:
+            result = None
+        elif local is None:
+            result = self._push_delete(task_id, remote_id, base_version, changed)
+        elif remote_id is None:
+            result = self._push_insert(local, changed)
+        else:
+            result = self._push_update(local, changed)
+
+        with applying(self.backend) as cursor:
+            if result is not None:
+                remote_id, base_version = result
+                cursor.execute("UPDATE tasks SET remote_id = %s, base_version = %s WHERE id = %s", (remote_id, base_version, task_id))
+                cursor.execute("UPDATE outbox SET remote_id = %s, base_version = %s WHERE task_id = %s AND id > %s",
+                               (remote_id, base_version, task_id, last_entry_id))
+            cursor.execute("DELETE FROM outbox WHERE task_id = %s AND id <= %s", (task_id, last_entry_id))
+
+    def _push_insert(self, local, changed):
+        try:
+            with self.remote.cursor(commit=True) as cursor:
+                cursor.execute("INSERT INTO tasks (user_id, title, due_date, priority, comments, status, completed_at) "
+                               "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                               (self.user_id, *(local[field] for field in TASK_FIELDS)))
+                return cursor.lastrowid, 1
+        except Exception as error:
+            if not is_integrity_error(error):
+                raise
+
+        remote = self._remote_task(f"{self.remote.nocase('title')} = %s", local["title"])
+        if remote is None:
+            raise RuntimeError(f"Task '{local['title']}' was rejected by the server")
+        if all(remote[field] == local[field] for field in TASK_FIELDS[:-1]):
+            return remote["id"], remote["version"]
+        self._record_conflict(local, remote["id"], "insert", "A task with this title already exists on the server")
+        self._apply_remote(remote, changed, replace=local["id"])
+        return None
+
+    def _push_update(self, local, changed):
+        with self.remote.cursor(commit=True) as cursor:
+            cursor.execute("UPDATE tasks SET title = %s, due_date = %s, priority = %s, comments = %s, status = %s, completed_at = %s, "
+                           "version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = %s AND user_id = %s AND version = %s",
+                           (*(local[field] for field in TASK_FIELDS), local["remote_id"], self.user_id, local["base_version"]))
+            if cursor.rowcount == 1:
+                return local["remote_id"], local["base_version"] + 1
+
+        remote = self._remote_task("id = %s", local["remote_id"])
+        if remote is None:
+            self._record_conflict(local, local["remote_id"], "update", "The task was deleted on the server")
+            with applying(self.backend) as cursor:
+                cursor.execute("DELETE FROM tasks WHERE id = %s", (local["id"],))
+            changed.add(local["id"])
+        else:
+            self._record_conflict(local, local["remote_id"], "update", "The task was changed on the server")
+            self._apply_remote(remote, changed)
+        return None
+
+    def _push_delete(self, task_id, remote_id, base_version, changed):
+        with self.remote.cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s AND version = %s", (remote_id, self.user_id, base_version))
+            if cursor.rowcount == 1:
+                cursor.execute("INSERT INTO task_deletions (task_id, user_id) VALUES (%s, %s)", (remote_id, self.user_id))
+                return None
+
+        remote = self._remote_task("id = %s", remote_id)
+        if remote is not None:
+            self._record_conflict({"id": task_id}, remote_id, "delete", "The task was changed on the server")
+            self._apply_remote(remote, changed)
+        return None
+
+    def pull(self, changed):
+        with self.backend.cursor() as cursor:
+            cursor.execute("SELECT pulled_at FROM sync_cursors WHERE user_id = %s", (self.user_id,))
+            row = cursor.fetchone()
+        pulled_at = row[0] if row else None
+
+        with self.remote.cursor() as cursor:
+            if pulled_at is None:
+                cursor.execute("SELECT id, title, due_date, priority, comments, status, completed_at, version, updated_at "
+                               "FROM tasks WHERE user_id = %s", (self.user_id,))
+                remote_tasks = cursor.fetchall()
+                deletions = []
+            else:
+                since = (datetime.strptime(pulled_at, TIMESTAMP_FORMAT) - timedelta(seconds=SYNC_OVERLAP_SECONDS)).strftime(TIMESTAMP_FORMAT)
+                cursor.execute("SELECT id, title, due_date, priority, comments, status, completed_at, version, updated_at "
+                               "FROM tasks WHERE user_id = %s AND updated_at >= %s", (self.user_id, since))
+                remote_tasks = cursor.fetchall()
+                cursor.execute("SELECT task_id, deleted_at FROM task_deletions WHERE user_id = %s AND deleted_at >= %s",
+                               (self.user_id, since))
+                deletions = cursor.fetchall()
+
+        timestamps = [_timestamp(task[-1]) for task in remote_tasks] + [_timestamp(deletion[1]) for deletion in deletions]
+        pending = self._pending_remote_ids()
+        with applying(self.backend) as cursor:
+            for row in remote_tasks:
+                if row[0] not in pending:
+                    self._apply_remote(dict(zip(("id", *TASK_FIELDS, "version", "updated_at"), row)), changed, cursor=cursor)
+            for remote_id, _ in deletions:
+                if remote_id in pending:
+                    continue
+                cursor.execute("SELECT id FROM tasks WHERE remote_id = %s", (remote_id,))
+                local = cursor.fetchone()
+                if local:
+                    cursor.execute("DELETE FROM tasks WHERE id = %s", (local[0],))
+                    changed.add(local[0])
+            if timestamps:
+                cursor.execute("INSERT OR REPLACE INTO sync_cursors (user_id, pulled_at) VALUES (%s, %s)",
+                               (self.user_id, max(filter(None, timestamps), default=pulled_at)))
+
+    def _apply_remote(self, remote, changed, cursor=None, replace=None):
+        """Writes a remote row into the replica unless the local copy is already at its version."""
+        if cursor is None:
+            with applying(self.backend) as cursor:
+                return self._apply_remote(remote, changed, cursor, replace)
+
+        if replace is not None:
+            cursor.execute("DELETE FROM tasks WHERE id = %s", (replace,))
+            changed.add(replace)
+        values = (*(remote[field] for field in TASK_FIELDS[:-1]), _timestamp(remote["completed_at"]),
+                  remote["version"], _timestamp(remote["updated_at"]))
+        cursor.execute("SELECT id, base_version FROM tasks WHERE remote_id = %s", (remote["id"],))
+        local = cursor.fetchone()
+        if local is None:
+            try:
+                cursor.execute("INSERT INTO tasks (user_id, title, due_date, priority, comments, status, completed_at, "
+                               "base_version, updated_at, remote_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                               (self.user_id, *values, remote["id"]))
+            except Exception as error:
+                if not is_integrity_error(error):
+                    raise
+                # A local task with the same title has not been pushed yet; its push resolves the clash.
+                return
+            changed.add(cursor.lastrowid)
+        elif local[1] is None or local[1] < remote["version"]:
+            cursor.execute("UPDATE tasks SET title = %s, due_date = %s, priority = %s, comments = %s, status = %s, completed_at = %s, "
+                           "base_version = %s, updated_at = %s WHERE id = %s", (*values, local[0]))
+            changed.add(local[0])
+
+    def _pending_remote_ids(self):
+        with self.backend.cursor() as cursor:
+            cursor.execute("SELECT outbox.remote_id, tasks.remote_id FROM outbox LEFT JOIN tasks ON tasks.id = outbox.task_id "
+                           "WHERE outbox.user_id = %s", (self.user_id,))
+            return {remote_id for row in cursor.fetchall() for remote_id in row if remote_id is not None}
+
+    def _local_task(self, task_id):
+        with self.backend.cursor() as cursor:
+            cursor.execute("SELECT id, title, due_date, priority, comments, status, completed_at, remote_id, base_version "
+                           "FROM tasks WHERE id = %s", (task_id,))
+            row = cursor.fetchone()
+        return dict(zip(("id", *TASK_FIELDS, "remote_id", "base_version"), row)) if row else None
+
+    def _remote_task(self, condition, value):
+        with self.remote.cursor() as cursor:
+            cursor.execute("SELECT id, title, due_date, priority, comments, status, completed_at, version, updated_at "
+                           f"FROM tasks WHERE user_id = %s AND {condition}", (self.user_id, value))
+            row = cursor.fetchone()
+        return dict(zip(("id", *TASK_FIELDS, "version", "updated_at"), row)) if row else None
+
+    def _record_conflict(self, local, remote_id, operation, reason):
+        logger.warning("Sync conflict on task %s (%s): %s", local["id"], operation, reason)
+        with self.backend.cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO sync_conflicts (user_id, task_id, remote_id, operation, reason, local_title, local_due_date, "
+                           "local_priority, local_comments, local_status) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                           (self.user_id, local["id"], remote_id, operation, reason,
+                            *(local.get(field) for field in TASK_FIELDS[:-1])))
+
+
+def status_text(status):
+    if status["online"] is None:
+        text = "Connecting..."
+    elif status["online"]:
+        text = f"Synced {status['synced_at']:%H:%M}"
+    else:
+        text = "Offline"
+    if status["pending"]:
+        text += f" — {status['pending']} changes pending"
+    if status["conflicts"]:
+        text += f" — {status['conflicts']} conflicts"
+    return text
+
+
+def conflict_text(conflict):
+    local = (f"'{conflict['local_title']}' due {conflict['local_due_date']}, {conflict['local_priority']}, {conflict['local_status']}"
+             if conflict["local_title"] is not None else "deleted")
+    return f"{conflict['detected_at']}  {conflict['operation']}: {conflict['reason']} (local copy: {local})"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or sys.argv[2:] not in ([], ["conflicts"], ["dismiss"]):
+        print(__doc__)
+        sys.exit(1)
+
+    backend = get_backend()
+    if not hasattr(backend, "remote"):
+        print("Set TASKMANAGER_BACKEND=replica to sync a local replica.")
+        sys.exit(1)
+    apply_migrations(backend)
+    prepare_replica(backend)
+    sync = ReplicaSync(backend, int(sys.argv[1]))
+    if sys.argv[2:] == ["conflicts"]:
+        for conflict in sync.conflicts():
+            print(conflict_text(conflict))
+    elif sys.argv[2:] == ["dismiss"]:
+        sync.dismiss_conflicts()
+    else:
+        sync.sync()
+    print(status_text(sync.status()))
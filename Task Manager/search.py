@@ -0,0 +1,95 @@
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r"\w+")
+EXACT_MATCH_BONUS = 2
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower()) if text else []
+
+
+class SearchIndex:
+    """Inverted index over named text fields with prefix matching and weighted ranking."""
+
+    def __init__(self, weights):
+        self.weights = weights
+        self.postings = defaultdict(dict)
+        self.doc_tokens = {}
+        self.sorted_tokens = []
+
+    def add(self, doc_id, fields, ordered=True):
+        """Indexes a document; with ordered=False new tokens are appended and sort_tokens() must be called after the batch."""
+        if doc_id in self.doc_tokens:
+            self.remove(doc_id)
+
+        postings = self.postings
+        tokens = set()
+        for field, text in fields.items():
+            for token in tokenize(text):
+                docs = postings.get(token)
+                if docs is None:
+                    docs = postings[token] = {}
+                    if ordered:
+                        insort(self.sorted_tokens, token)
+                    else:
+                        self.sorted_tokens.append(token)
+                field_counts = docs.get(doc_id)
+                if field_counts is None:
+                    docs[doc_id] = {field: 1}
+                    tokens.add(token)
+                else:
+                    field_counts[field] = field_counts.get(field, 0) + 1
+        self.doc_tokens[doc_id] = tokens
+
+    def sort_tokens(self):
+        self.sorted_tokens.sort()
+
+    def remove(self, doc_id):
+        for token in self.doc_tokens.pop(doc_id, ()):
+            docs = self.postings[token]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[token]
+                del self.sorted_tokens[bisect_left(self.sorted_tokens, token)]
+
+    def matches(self, doc_id, query, fields=None):
+        """Whether search(query, fields) would return doc_id, without scoring the other documents."""
+        tokens = self.doc_tokens.get(doc_id)
+        terms = tokenize(query)
+        if not tokens or not terms:
+            return False
+        return all(any(token.startswith(term) and any(fields is None or field in fields for field in self.postings[token][doc_id])
+                       for token in tokens)
+                   for term in terms)
+
+    def _expand(self, prefix):
+        start = bisect_left(self.sorted_tokens, prefix)
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def search(self, query, fields=None):
+        scores = None
+        for term in tokenize(query):
+            term_scores = {}
+            for token in self._expand(term):
+                bonus = EXACT_MATCH_BONUS if token == term else 1
+                for doc_id, field_counts in self.postings[token].items():
+                    score = sum(self.weights.get(field, 1) * count
+                                for field, count in field_counts.items() if fields is None or field in fields)
+                    if score:
+                        term_scores[doc_id] = term_scores.get(doc_id, 0) + score * bonus
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores:
+                return []
+
+        if scores is None:
+            return []
+        return sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
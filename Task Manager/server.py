@@ -0,0 +1,418 @@
+"""
+Program: server.py
+Serves TaskManager over HTTP as a JSON API, without the Tkinter interface.
+Requests are parsed on an asyncio event loop; the blocking TaskManager and database calls
+run on a thread pool sized to the connection pool. Each user's tasks are loaded once and
+kept in memory, and calls for the same user are serialized. At most once per second a call
+first re-reads the tasks other clients changed or deleted since the session's last check.
+Usage: python server.py [host] [port]   (default: 127.0.0.1 8080)
+
+Endpoints:
+    POST   /users                          {"username": ...}          register a user
+    GET    /users?username=<name>                                     look up a user id
+    GET    /users/<id>/tasks               ?page=&per_page=&q=&status=&priority=&due_date=&bucket=
+                                           without page: keyset pages by (due_date, id), ?after=<next>
+    POST   /users/<id>/tasks               {"title", "due_date", "priority", "comments", "status"}
+    GET    /users/<id>/tasks/<task id>
+    PUT    /users/<id>/tasks/<task id>     same body as POST
+    DELETE /users/<id>/tasks/<task id>
+    GET    /users/<id>/statistics
+"""
+
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from database import POOL_SIZE, PROFILER
+from migrate import apply_migrations
+from storage import get_backend
+from taskManager import Task, TaskManager, BUCKETS, PRIORITIES, STATUSES, sort_tasks
+import users
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+PER_PAGE = 50
+MAX_PER_PAGE = 500
+MAX_BODY_SIZE = 1024 * 1024
+MAX_SESSIONS = 256
+KEEP_ALIVE_TIMEOUT = 15
+FRESHNESS_INTERVAL = 1.0
+# Changes are probed from a little before the newest one seen, for rows whose transaction committed after a later one.
+FRESHNESS_OVERLAP_SECONDS = 2
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def task_to_json(task):
+    return {"id": task.id, "title": task.title, "due_date": task.due_date.strftime("%Y-%m-%d"),
+            "priority": task.priority, "comments": task.comments, "status": task.status}
+
+
+def task_from_json(body, task_id=None):
+    if not isinstance(body, dict) or not body.get("title") or not body.get("due_date"):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "title and due_date are required")
+    try:
+        due_date = datetime.strptime(body["due_date"], "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid date format. Please use YYYY-MM-DD.")
+
+    priority = body.get("priority") or "Normal"
+    status = body.get("status") or "Pending"
+    if priority not in PRIORITIES:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"priority must be one of {', '.join(PRIORITIES)}")
+    if status not in STATUSES:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"status must be one of {', '.join(STATUSES)}")
+    return Task(task_id, str(body["title"]), due_date, priority, str(body.get("comments") or ""), status)
+
+
+def encode_page_key(key):
+    return f"{key[0].isoformat()}:{key[1]}" if key else None
+
+
+def decode_page_key(token):
+    try:
+        due_date, task_id = token.split(":")
+        return datetime.strptime(due_date, "%Y-%m-%d").date(), int(task_id)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "after must be a next value from a previous page")
+
+
+def parse_timestamp(value):
+    return value if isinstance(value, datetime) else datetime.strptime(str(value)[:19], TIMESTAMP_FORMAT)
+
+
+def int_param(query, name, default, maximum=None):
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    if value < 1:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be at least 1")
+    return min(value, maximum) if maximum else value
+
+
+class Session:
+    """One user's TaskManager, used by one request at a time."""
+
+    def __init__(self, task_manager):
+        self.task_manager = task_manager
+        self.lock = threading.Lock()
+        self.users = 0          # requests holding or waiting for the session; only idle sessions are evicted
+        self.checked_at = None  # newest change seen, in the database clock; None until the tasks are loaded
+        self.probed_at = 0.0    # time.monotonic() of the last check
+        self.seen = {}          # task id -> (timestamp, version) of the changes returned by the last probe, already applied
+
+
+class TaskService:
+    """The TaskManager operations behind the HTTP routes. Every method here blocks and runs on the thread pool."""
+
+    def __init__(self, backend=None, max_sessions=MAX_SESSIONS):
+        self.backend = backend or get_backend()
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.sessions_lock = threading.Lock()
+        self.users_lock = threading.Lock()
+
+    @contextmanager
+    def session(self, user_id):
+        """Yields the user's up-to-date TaskManager while holding its lock."""
+        with self.sessions_lock:
+            session = self.sessions.get(user_id)
+            if session:
+                self.sessions.move_to_end(user_id)
+                session.users += 1
+        if session is None:
+            if not users.user_exists(self.backend, user_id):
+                raise HTTPError(HTTPStatus.NOT_FOUND, "User not found")
+            with self.sessions_lock:
+                session = self.sessions.get(user_id)
+                if session is None:
+                    session = self.sessions[user_id] = Session(TaskManager(user_id, self.backend))
+                session.users += 1
+                self._evict()
+
+        try:
+            with session.lock:
+                self._refresh(session)
+                yield session.task_manager
+        finally:
+            with self.sessions_lock:
+                session.users -= 1
+
+    def _evict(self):
+        # Sessions in use stay, so a user never has two TaskManagers; the limit is exceeded until they are released.
+        idle = [user_id for user_id, session in self.sessions.items() if not session.users]
+        for user_id in idle[:len(self.sessions) - self.max_sessions]:
+            del self.sessions[user_id]
+
+    def _refresh(self, session):
+        if session.checked_at is not None and time.monotonic() - session.probed_at < FRESHNESS_INTERVAL:
+            return
+        task_manager = session.task_manager
+        with self.backend.cursor() as cursor:
+            checked_at = session.checked_at
+            if checked_at is None:
+                cursor.execute("SELECT CURRENT_TIMESTAMP")
+                checked_at = parse_timestamp(cursor.fetchone()[0])
+            since = checked_at - timedelta(seconds=FRESHNESS_OVERLAP_SECONDS)
+            cursor.execute("SELECT id, updated_at, version FROM tasks WHERE user_id = %s AND updated_at >= %s",
+                           (task_manager.user_id, since))
+            changes = {task_id: (timestamp, version) for task_id, timestamp, version in cursor.fetchall()}
+            cursor.execute("SELECT task_id, deleted_at FROM task_deletions WHERE user_id = %s AND deleted_at >= %s",
+                           (task_manager.user_id, since))
+            changes.update((task_id, (deleted_at, None)) for task_id, deleted_at in cursor.fetchall() if task_id in task_manager.tasks)
+
+        if session.checked_at is None:
+            # The load already has the changes the probe just returned; they are only remembered as seen.
+            task_manager.load_all()
+        else:
+            # Timestamps only have second resolution, so the version tells two changes within the same second apart.
+            changed = [task_id for task_id, change in changes.items() if session.seen.get(task_id) != change]
+            if changed:
+                task_manager.refresh_tasks(changed)
+        if changes:
+            checked_at = max(checked_at, parse_timestamp(max(timestamp for timestamp, _ in changes.values())))
+        # The next probe starts no earlier than this one, so only these rows can come back unchanged.
+        session.checked_at, session.seen, session.probed_at = checked_at, changes, time.monotonic()
+
+    def find_user(self, query):
+        username = query.get("username", [""])[0]
+        if not username:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "username is required")
+        user_id = users.get_user_id(self.backend, username)
+        if user_id is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "User not found")
+        return HTTPStatus.OK, {"id": user_id, "username": username}
+
+    def register_user(self, body):
+        username = body.get("username") if isinstance(body, dict) else None
+        if not username:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "username is required")
+        with self.users_lock:
+            if users.get_user_id(self.backend, username) is not None:
+                raise HTTPError(HTTPStatus.CONFLICT, "A user with this username already exists.")
+            user_id = users.insert_user(self.backend, username)
+        return HTTPStatus.CREATED, {"id": user_id, "username": username}
+
+    def list_tasks(self, user_id, query):
+        page = int_param(query, "page", 1)
+        per_page = int_param(query, "per_page", PER_PAGE, MAX_PER_PAGE)
+        keyword = query.get("q", [""])[0]
+        bucket = query.get("bucket", [""])[0]
+        if bucket and bucket not in BUCKETS:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"bucket must be one of {', '.join(BUCKETS)}")
+
+        after = query.get("after", [""])[0]
+        filtered = keyword or any(query.get(field, [""])[0] for field in ("status", "priority", "due_date"))
+        if after and filtered:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "after can only be combined with bucket and per_page")
+
+        if not filtered and (after or "page" not in query):
+            with self.session(user_id) as task_manager:
+                start, end = task_manager.bucket_bounds(bucket) if bucket else (None, None)
+                tasks, next_key = task_manager.page_tasks(decode_page_key(after) if after else None, per_page, start, end)
+            return HTTPStatus.OK, {"tasks": [task_to_json(task) for task in tasks], "per_page": per_page,
+                                   "next": encode_page_key(next_key)}
+
+        with self.session(user_id) as task_manager:
+            if keyword:
+                tasks = task_manager.filter_tasks(keyword)
+            elif bucket:
+                tasks = task_manager.tasks_in_bucket(bucket)
+            else:
+                tasks = task_manager.tasks_due_between()
+            for field in ("status", "priority", "due_date"):
+                value = query.get(field, [""])[0]
+                if value:
+                    tasks = [task for task in tasks if self._matches(task, field, value)]
+            if keyword:
+                sort_tasks(tasks, [("due_date", False)])
+
+        start = (page - 1) * per_page
+        return HTTPStatus.OK, {"tasks": [task_to_json(task) for task in tasks[start:start + per_page]],
+                               "page": page, "per_page": per_page, "total": len(tasks)}
+
+    def _matches(self, task, field, value):
+        if field == "due_date":
+            return task.due_date.strftime("%Y-%m-%d") == value
+        return getattr(task, field) == value
+
+    def get_task(self, user_id, task_id):
+        with self.session(user_id) as task_manager:
+            task = task_manager.get_task(task_id)
+        if task is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Task not found")
+        return HTTPStatus.OK, task_to_json(task)
+
+    def add_task(self, user_id, body):
+        task = task_from_json(body)
+        with self.session(user_id) as task_manager:
+            if not task_manager.add_task(task):
+                raise HTTPError(HTTPStatus.CONFLICT, "A task with this title already exists.")
+        return HTTPStatus.CREATED, task_to_json(task)
+
+    def update_task(self, user_id, task_id, body):
+        task = task_from_json(body, task_id)
+        with self.session(user_id) as task_manager:
+            if task_manager.get_task(task_id) is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Task not found")
+            if not task_manager.update_task(task):
+                raise HTTPError(HTTPStatus.CONFLICT, "A task with this title already exists.")
+        return HTTPStatus.OK, task_to_json(task)
+
+    def remove_task(self, user_id, task_id):
+        with self.session(user_id) as task_manager:
+            task = task_manager.get_task(task_id)
+            if task is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Task not found")
+            task_manager.remove_task(task)
+        return HTTPStatus.NO_CONTENT, None
+
+    def statistics(self, user_id):
+        with self.session(user_id) as task_manager:
+            statistics = task_manager.get_statistics()
+            weekly = task_manager.get_completions_per_week()
+        statistics["completed_per_week"] = [{"week": week.isoformat(), "completed": count} for week, count in weekly]
+        return HTTPStatus.OK, statistics
+
+
+ROUTES = [
+    ("GET", re.compile(r"/users"), lambda service, query, body: service.find_user(query)),
+    ("POST", re.compile(r"/users"), lambda service, query, body: service.register_user(body)),
+    ("GET", re.compile(r"/users/(\d+)/tasks"), lambda service, query, body, user_id: service.list_tasks(user_id, query)),
+    ("POST", re.compile(r"/users/(\d+)/tasks"), lambda service, query, body, user_id: service.add_task(user_id, body)),
+    ("GET", re.compile(r"/users/(\d+)/tasks/(\d+)"), lambda service, query, body, user_id, task_id: service.get_task(user_id, task_id)),
+    ("PUT", re.compile(r"/users/(\d+)/tasks/(\d+)"), lambda service, query, body, user_id, task_id: service.update_task(user_id, task_id, body)),
+    ("DELETE", re.compile(r"/users/(\d+)/tasks/(\d+)"), lambda service, query, body, user_id, task_id: service.remove_task(user_id, task_id)),
+    ("GET", re.compile(r"/users/(\d+)/statistics"), lambda service, query, body, user_id: service.statistics(user_id)),
+]
+
+
+class TaskServer:
+    def __init__(self, service=None, max_workers=POOL_SIZE):
+        self.service = service or TaskService()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def route(self, method, path):
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.fullmatch(path)
+            if match:
+                if route_method == method:
+                    return handler, [int(group) for group in match.groups()]
+                allowed = True
+        if allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Not found")
+
+    async def handle(self, method, target, body):
+        try:
+            url = urlsplit(target)
+            handler, args = self.route(method, url.path.rstrip("/") or "/")
+            try:
+                body = json.loads(body) if body else None
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be JSON")
+            args = [handler, self.service, parse_qs(url.query), body, *args]
+            if PROFILER.enabled:
+                args = [PROFILER.run_as, method + " " + re.sub(r"/\d+", "/<id>", url.path), *args]
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, *args)
+        except HTTPError as error:
+            return error.status, {"error": str(error)}
+        except Exception as error:
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                if body is None:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}
+                else:
+                    status, payload = await self.handle(method, target, body)
+
+                keep_alive = headers.get("connection", "").lower() != "close" and body is not None
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        if not request_line.strip():
+            return None
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        method = method.upper()
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_SIZE:
+            return method, target, headers, None
+        body = await reader.readexactly(length) if length else b""
+        return method, target, headers, body
+
+    def write_response(self, writer, status, payload, keep_alive):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status.value} {status.phrase}",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if payload is not None:
+            head.append("Content-Type: application/json")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(host, port):
+    apply_migrations()
+    server = TaskServer()
+    listener = await server.start(host, port)
+    print(f"Serving Task Manager on http://{host}:{port}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    host = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_HOST
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,175 @@
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from database import ConnectionPool, POOL_SIZE, PROFILER, connect_mysql
+
+BACKEND = os.environ.get("TASKMANAGER_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("TASKMANAGER_SQLITE_PATH",
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), "taskManager.db"))
+SQLITE_CACHED_STATEMENTS = 256
+REPLICA_PATH = os.environ.get("TASKMANAGER_REPLICA_PATH",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "replica.db"))
+REPLICA_REMOTE = os.environ.get("TASKMANAGER_REPLICA_REMOTE", "mysql")
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+
+def is_integrity_error(error):
+    # sqlite3 and mysql.connector both follow DB-API and name their constraint error IntegrityError.
+    return type(error).__name__ == "IntegrityError"
+
+
+class BackendCursor:
+    def __init__(self, backend, cursor):
+        self.backend = backend
+        self.cursor = cursor
+
+    def execute(self, query, params=()):
+        return self.cursor.execute(self.backend.sql(query), params)
+
+    def executemany(self, query, rows):
+        return self.cursor.executemany(self.backend.sql(query), rows)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class StorageBackend:
+    """SQL storage shared by all engines. Queries are written with %s placeholders."""
+
+    name = None
+    placeholder = "%s"
+
+    def __init__(self, connect, pool_size=POOL_SIZE):
+        self.pool = ConnectionPool(connect, size=pool_size)
+
+    def sql(self, query):
+        if self.placeholder == "%s":
+            return query
+        return query.replace("%s", self.placeholder)
+
+    @contextmanager
+    def cursor(self, commit=False):
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            if PROFILER.enabled:
+                cursor = PROFILER.wrap(cursor)
+            try:
+                yield BackendCursor(self, cursor)
+                if commit:
+                    connection.commit()
+            except BaseException:
+                if commit:
+                    connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def explain(self, cursor, query, params):
+        raise NotImplementedError
+
+    def week_start(self, column):
+        raise NotImplementedError
+
+    def nocase(self, column):
+        raise NotImplementedError
+
+    def today(self):
+        """The current date in the clock CURRENT_TIMESTAMP writes, so it can be compared with stored timestamps."""
+        raise NotImplementedError
+
+    def close(self):
+        self.pool.close_all()
+
+
+class MySQLBackend(StorageBackend):
+    name = "mysql"
+
+    def __init__(self, pool_size=POOL_SIZE):
+        super().__init__(connect_mysql, pool_size)
+
+    def explain(self, cursor, query, params):
+        cursor.execute("EXPLAIN " + query, params)
+        columns = [column[0] for column in cursor.description]
+        plan = dict(zip(columns, cursor.fetchone()))
+        return plan.get("key"), f"type={plan.get('type')} rows={plan.get('rows')}"
+
+    def week_start(self, column):
+        return f"DATE(DATE_SUB({column}, INTERVAL WEEKDAY({column}) DAY))"
+
+    def nocase(self, column):
+        # The default collation already compares case-insensitively.
+        return column
+
+    def today(self):
+        # CURRENT_TIMESTAMP follows the session time zone, which need not be the app's.
+        with self.cursor() as cursor:
+            cursor.execute("SELECT CURRENT_DATE")
+            return cursor.fetchone()[0]
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+    placeholder = "?"
+
+    def __init__(self, path=SQLITE_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        super().__init__(self._connect, pool_size)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES,
+                                     cached_statements=SQLITE_CACHED_STATEMENTS)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def explain(self, cursor, query, params):
+        cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+        detail = " | ".join(row[-1] for row in cursor.fetchall())
+        index = re.search(r"USING (?:COVERING )?INDEX (\w+)|USING INTEGER PRIMARY KEY", detail)
+        return (index.group(1) or "PRIMARY") if index else None, detail
+
+    def week_start(self, column):
+        return f"date({column}, 'weekday 0', '-6 days')"
+
+    def nocase(self, column):
+        return f"{column} COLLATE NOCASE"
+
+    def today(self):
+        # SQLite's CURRENT_TIMESTAMP is always UTC.
+        return datetime.now(timezone.utc).date()
+
+
+class ReplicaBackend(SQLiteBackend):
+    """Local SQLite copy that serves every read and write; replica.py syncs it with the remote backend."""
+
+    migration_dirs = ("sqlite", "replica")
+
+    def __init__(self, path=REPLICA_PATH, remote=None, pool_size=POOL_SIZE):
+        super().__init__(path, pool_size)
+        self.remote = remote or BACKENDS[REPLICA_REMOTE]()
+
+    def close(self):
+        super().close()
+        self.remote.close()
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend, "replica": ReplicaBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = BACKENDS[BACKEND]()
+        return _backend
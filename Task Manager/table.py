@@ -0,0 +1,142 @@
+from itertools import islice
+from tkinter import ttk
+
+ROW_HEIGHT = 20
+HEADER_HEIGHT = 25
+
+
+class VirtualTable(ttk.Frame):
+    """Treeview that only creates items for the rows currently on screen.
+
+    The full row list lives in Python, keyed by id in display order, so adding, replacing and removing a row
+    does not depend on the table size; scrolling re-renders the visible window from it.
+    """
+
+    def __init__(self, master, columns, row_values):
+        super().__init__(master)
+        self.row_values = row_values
+        self.rows = {}
+        self.offset = 0
+        self.page_size = 1
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=self.page_size)
+        for column in columns:
+            self.tree.heading(column, text=column)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scroll)
+
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll_by(-1 if event.delta > 0 else 1) or "break")
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-1) or "break")
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(1) or "break")
+        self.tree.bind("<Up>", self.on_key_up)
+        self.tree.bind("<Down>", self.on_key_down)
+
+    def set_rows(self, rows):
+        self.rows = {row.id: row for row in rows}
+        self.offset = min(self.offset, self.max_offset())
+        self.render()
+
+    def append(self, row):
+        self.rows[row.id] = row
+        if len(self.rows) - self.offset <= self.page_size:
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def extend(self, rows):
+        visible = len(self.rows) < self.offset + self.page_size
+        self.rows.update((row.id, row) for row in rows)
+        if visible:
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def remove(self, task_id):
+        if self.rows.pop(task_id, None) is None:
+            return False
+
+        # Rows above the window only shift it by one; the window is redrawn when the row was on screen.
+        if self.tree.exists(str(task_id)) or self.offset > self.max_offset():
+            self.offset = min(self.offset, self.max_offset())
+            self.render()
+        else:
+            self.update_scrollbar()
+        return True
+
+    def replace(self, row):
+        if row.id not in self.rows:
+            return False
+
+        self.rows[row.id] = row
+        item = str(row.id)
+        if self.tree.exists(item):
+            self.tree.item(item, values=self.row_values(row))
+        return True
+
+    def visible_rows(self):
+        return list(islice(self.rows.values(), self.offset, self.offset + self.page_size))
+
+    def max_offset(self):
+        return max(0, len(self.rows) - self.page_size)
+
+    def render(self):
+        selection = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for row in self.visible_rows():
+            self.tree.insert("", "end", iid=str(row.id), values=self.row_values(row))
+
+        visible = [item for item in selection if self.tree.exists(item)]
+        if visible:
+            self.tree.selection_set(visible)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if not self.rows:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(self.offset / len(self.rows), min(1, (self.offset + self.page_size) / len(self.rows)))
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.rows)))
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.page_size)
+        else:
+            self.scroll_by(int(amount))
+
+    def on_resize(self, event):
+        page_size = max(1, (event.height - HEADER_HEIGHT) // ROW_HEIGHT)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.offset = min(self.offset, self.max_offset())
+            self.render()
+
+    def on_key_up(self, event):
+        children = self.tree.get_children()
+        if children and self.tree.focus() == children[0] and self.offset > 0:
+            self.scroll_by(-1)
+            self.move_cursor(self.tree.get_children()[0])
+            return "break"
+
+    def on_key_down(self, event):
+        children = self.tree.get_children()
+        if children and self.tree.focus() == children[-1] and self.offset < self.max_offset():
+            self.scroll_by(1)
+            self.move_cursor(self.tree.get_children()[-1])
+            return "break"
+
+    def move_cursor(self, item):
+        self.tree.focus(item)
+        self.tree.selection_set(item)
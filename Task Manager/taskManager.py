@@ -1,12 +1,41 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime, timedelta
-from database import db_connection, cursor
-import matplotlib.pyplot as plt
+from datetime import date, datetime, timedelta
+from storage import ReplicaBackend, get_backend, is_integrity_error
 from operator import attrgetter
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from search import SearchIndex
+from cache import QueryCache
+from worker import BackgroundWorker
+from table import VirtualTable
+
+TASK_COLUMNS = "id, title, due_date, priority, comments, status"
+FETCH_SIZE = 1000
+PAGE_SIZE = 200
+BATCH_SIZE = 500
+INSERT_TASK = ("INSERT INTO tasks (user_id, title, due_date, priority, comments, status, completed_at) "
+               "VALUES (%s, %s, %s, %s, %s, %s, CASE WHEN %s = 'Completed' THEN CURRENT_TIMESTAMP ELSE NULL END)")
+SEARCH_WEIGHTS = {"title": 3, "comments": 1, "due_date": 1, "priority": 1, "status": 1}
+TEXT_FIELDS = ("title", "comments")
+FILTER_FIELDS = ("title", "due_date", "priority", "status")
+STATUSES = ("Pending", "In Progress", "Completed")
+PRIORITIES = ("Normal", "Medium", "High")
+PRIORITY_RANKS = {priority: rank for rank, priority in enumerate(PRIORITIES)}
+STATUS_RANKS = {status: rank for rank, status in enumerate(STATUSES)}
+WEEKLY_TREND_WEEKS = 12
+TABLE_COLUMNS = ("Task Name", "Due Date", "Priority", "Comments", "Status")
+CONFLICT_COLUMNS = ("Detected", "Change", "Reason", "Local Title", "Local Due Date", "Local Status")
+BUCKETS = ('Day', 'Week', 'Month')
+ROLLOVER_DELAY_MS = 1000
+SORT_OPTIONS = (("Due Date", "due_date"), ("Task Name", "title"), ("Status", "status"), ("Priority", "priority"))
 
 
 class Task:
+    """A task row. The sort keys (due_ordinal, priority_rank, status_rank) follow their fields when those are assigned."""
+
+    __slots__ = ("id", "title", "_due_date", "_priority", "comments", "_status", "priority_rank", "status_rank", "due_ordinal")
+
     def __init__(self, id, title, due_date, priority, comments, status):
         self.id = id
         self.title = title
@@ -15,74 +44,563 @@ class Task:
         self.comments = comments
         self.status = status
 
+    @property
+    def due_date(self):
+        return self._due_date
+
+    @due_date.setter
+    def due_date(self, due_date):
+        self._due_date = due_date
+        self.due_ordinal = due_date.toordinal()
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @priority.setter
+    def priority(self, priority):
+        self._priority = priority
+        self.priority_rank = PRIORITY_RANKS.get(priority, len(PRIORITIES))
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, status):
+        self._status = status
+        self.status_rank = STATUS_RANKS.get(status, len(STATUSES))
+
+    def copy(self):
+        return Task(self.id, self.title, self.due_date, self.priority, self.comments, self.status)
+
+def title_key(title):
+    # MySQL's default collation makes the (user_id, title) unique index case-insensitive.
+    return title.casefold()
+
+
+SORT_KEYS = {
+    "title": attrgetter("title"),
+    "due_date": attrgetter("due_ordinal"),
+    "priority": attrgetter("priority_rank"),
+    "status": attrgetter("status_rank"),
+}
+
+def sort_tasks(tasks, criteria):
+    """Sorts tasks in place by (field, descending) pairs, most significant first. Equal tasks keep their order."""
+    for field, descending in reversed(criteria):
+        tasks.sort(key=SORT_KEYS[field], reverse=descending)
+    return tasks
+
+class TaskStatistics:
+    def __init__(self, today):
+        self.today = today
+        self.week_end = today + timedelta(days=7)
+        self.status = Counter()
+        self.priority = Counter()
+        self.buckets = Counter()
+        self.overdue = 0
+        self.total = 0
+
+    def bucket_for(self, due_date):
+        if due_date <= self.today:
+            return 'Day'
+        elif due_date <= self.week_end:
+            return 'Week'
+        return 'Month'
+
+    def load(self, rows):
+        for status, priority, overdue, day, week, month, total in rows:
+            self.status[status] += total
+            self.priority[priority] += total
+            self.buckets.update({'Day': int(day), 'Week': int(week), 'Month': int(month)})
+            self.overdue += int(overdue)
+            self.total += total
+
+    def add(self, task, sign=1):
+        due_date = task.due_date.date()
+        self.status[task.status] += sign
+        self.priority[task.priority] += sign
+        self.buckets[self.bucket_for(due_date)] += sign
+        if due_date < self.today and task.status != 'Completed':
+            self.overdue += sign
+        self.total += sign
+
+    def remove(self, task):
+        self.add(task, -1)
+
+    def snapshot(self):
+        return {
+            "status": {status: self.status[status] for status in STATUSES},
+            "priority": {priority: self.priority[priority] for priority in PRIORITIES},
+            "buckets": {bucket: self.buckets[bucket] for bucket in BUCKETS},
+            "overdue": self.overdue,
+            "total": self.total,
+        }
+
 class TaskManager:
-    def __init__(self, user_id):
+    def __init__(self, user_id, backend=None):
         self.user_id = user_id
-        self.tasks_day = []
-        self.tasks_week = []
-        self.tasks_month = []
+        self.backend = backend or get_backend()
+        self.listeners = []
+        self.version = 0
+        self.query_cache = QueryCache()
+        self.set_today(datetime.today().date())
+        self._reset_store()
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def _emit(self, event, task, old_task=None):
+        for listener in self.listeners:
+            listener(event, task, old_task)
+
+    def set_today(self, today):
+        self.today = today
+        self.week_end = today + timedelta(days=7)
+
+    def bucket_for(self, due_date, today=None):
+        if today is None:
+            today, week_end = self.today, self.week_end
+        else:
+            week_end = today + timedelta(days=7)
+        if due_date <= today:
+            return 'Day'
+        elif due_date <= week_end:
+            return 'Week'
+        else:
+            return 'Month'
+
+    def bucket_bounds(self, bucket):
+        return {'Day': (None, self.today), 'Week': (self.today, self.week_end), 'Month': (self.week_end, None)}[bucket]
+
+    def tasks_due_between(self, start=None, end=None):
+        """Tasks due after start and on or before end, in due date order. None leaves that side open."""
+        low = 0 if start is None else bisect_right(self.due_index, (start.toordinal(), float("inf")))
+        high = len(self.due_index) if end is None else bisect_right(self.due_index, (end.toordinal(), float("inf")))
+        return [self.tasks[task_id] for _, task_id in self.due_index[low:high]]
+
+    def tasks_in_bucket(self, bucket):
+        return self.tasks_due_between(*self.bucket_bounds(bucket))
+
+    @property
+    def tasks_day(self):
+        return self.tasks_due_between(end=self.today)
+
+    @property
+    def tasks_week(self):
+        return self.tasks_due_between(end=self.week_end)
+
+    @property
+    def tasks_month(self):
+        return self.tasks_due_between(end=self.today + timedelta(days=30))
+
+    def roll_over(self, today=None):
+        """Moves the bucket boundaries to today; returns (task, old bucket, new bucket) for tasks that changed bucket."""
+        today = today or datetime.today().date()
+        if today == self.today:
+            return []
+
+        old_today, old_week_end = self.today, self.week_end
+        self.set_today(today)
+        moved = {}
+        for old_bound, new_bound in ((old_today, self.today), (old_week_end, self.week_end)):
+            for task in self.tasks_due_between(min(old_bound, new_bound), max(old_bound, new_bound)):
+                due_date = task.due_date.date()
+                old_bucket, new_bucket = self.bucket_for(due_date, old_today), self.bucket_for(due_date)
+                if old_bucket != new_bucket:
+                    moved[task.id] = (task, old_bucket, new_bucket)
+        return list(moved.values())
+
+    def _reset_store(self):
+        self.tasks = {}
+        # Copies of the tasks as they were indexed: callers may change the live Task objects in place before
+        # passing them to update_tasks, so the index entries to remove are looked up from these copies.
+        self.indexed = {}
+        self.tasks_by_title = {}
+        self.tasks_by_status = defaultdict(set)
+        self.tasks_by_priority = defaultdict(set)
+        self.tasks_by_due_date = defaultdict(set)
+        self.search_index = SearchIndex(SEARCH_WEIGHTS)
+        self.due_index = []
+        self.statistics = None
+        self.weekly_completions = None
+
+    def _index_task(self, task, ordered=True):
+        self.tasks[task.id] = task
+        self.indexed[task.id] = task = task.copy()
+        if ordered:
+            insort(self.due_index, (task.due_ordinal, task.id))
+        else:
+            self.due_index.append((task.due_ordinal, task.id))
+        self.tasks_by_title[title_key(task.title)] = task.id
+        self.tasks_by_status[task.status].add(task.id)
+        self.tasks_by_priority[task.priority].add(task.id)
+        self.tasks_by_due_date[task.due_date.date()].add(task.id)
+        self.search_index.add(task.id, {"title": task.title, "comments": task.comments,
+                                        "due_date": task.due_date.strftime('%Y-%m-%d'),
+                                        "priority": task.priority, "status": task.status}, ordered)
+        if self.statistics:
+            self.statistics.add(task)
+        if task.status == 'Completed':
+            self.weekly_completions = None
+
+    def _unindex_task(self, task_id):
+        del self.tasks[task_id]
+        task = self.indexed.pop(task_id)
+        if self.tasks_by_title.get(title_key(task.title)) == task.id:
+            del self.tasks_by_title[title_key(task.title)]
+        self.tasks_by_status[task.status].discard(task.id)
+        self.tasks_by_priority[task.priority].discard(task.id)
+        self.tasks_by_due_date[task.due_date.date()].discard(task.id)
+        position = bisect_left(self.due_index, (task.due_ordinal, task.id))
+        del self.due_index[position]
+        self.search_index.remove(task.id)
+        if self.statistics:
+            self.statistics.remove(task)
+        if task.status == 'Completed':
+            self.weekly_completions = None
+        return task
+
+    def get_task(self, task_id):
+        return self.tasks.get(task_id)
+
+    def find_by_title(self, title):
+        return self.tasks.get(self.tasks_by_title.get(title_key(title)))
+
+    def find_by_status(self, status):
+        return [self.tasks[task_id] for task_id in self.tasks_by_status.get(status, ())]
+
+    def find_by_priority(self, priority):
+        return [self.tasks[task_id] for task_id in self.tasks_by_priority.get(priority, ())]
+
+    def find_by_due_date(self, due_date):
+        return [self.tasks[task_id] for task_id in self.tasks_by_due_date.get(due_date, ())]
+
+    def search(self, keyword, fields=None):
+        return [self.tasks[task_id] for task_id in self.search_index.search(keyword, fields)]
 
     def add_task(self, task):
-        cursor.execute("SELECT id FROM tasks WHERE title = %s AND user_id = %s", (task.title, self.user_id))
-        existing_task = cursor.fetchone()
-        if existing_task:
-            return
+        if title_key(task.title) in self.tasks_by_title:
+            return False
 
-        today = datetime.today().date()
-        due_date = task.due_date.date()
+        try:
+            with self.backend.cursor(commit=True) as cursor:
+                cursor.execute(INSERT_TASK, self._insert_params(task))
+                task.id = cursor.lastrowid
+        except Exception as error:
+            if is_integrity_error(error):
+                return False
+            raise
+
+        self.version += 1
+        self._index_task(task)
+        self._emit("added", task)
+        return True
+
+    def _insert_params(self, task):
+        return self.user_id, task.title, task.due_date.date(), task.priority, task.comments, task.status, task.status
+
+    def add_tasks(self, tasks):
+        titles = set(self.tasks_by_title)
+        new_tasks = []
+        for task in tasks:
+            if title_key(task.title) not in titles:
+                titles.add(title_key(task.title))
+                new_tasks.append(task)
+        if not new_tasks:
+            return []
+
+        added = []
+        try:
+            for start in range(0, len(new_tasks), BATCH_SIZE):
+                chunk = new_tasks[start:start + BATCH_SIZE]
+                try:
+                    added.extend(self._insert_chunk(chunk))
+                except Exception as error:
+                    if not is_integrity_error(error):
+                        raise
+                    # The database already has one of these titles: the store was not loaded, or MySQL's collation
+                    # also ignores accents and trailing spaces. Insert the chunk row by row and skip the duplicates.
+                    added.extend(self._insert_each(chunk))
+        finally:
+            # Chunks are committed one by one, so the ones written before a failure are indexed too.
+            self.version += 1
+            for task in added:
+                self._index_task(task)
+                self._emit("added", task)
+        return added
+
+    def _insert_chunk(self, chunk):
+        with self.backend.cursor(commit=True) as cursor:
+            cursor.executemany(INSERT_TASK, [self._insert_params(task) for task in chunk])
+            cursor.execute(f"SELECT id, title FROM tasks WHERE user_id = %s AND title IN ({', '.join(['%s'] * len(chunk))})",
+                           (self.user_id, *(task.title for task in chunk)))
+            rows = cursor.fetchall()
+        ids = {title: id for id, title in rows}
+        ids_by_key = {title_key(title): id for id, title in rows}
+        for task in chunk:
+            task.id = ids.get(task.title) or ids_by_key[title_key(task.title)]
+        return chunk
+
+    def _insert_each(self, chunk):
+        added = []
+        with self.backend.cursor(commit=True) as cursor:
+            for task in chunk:
+                try:
+                    cursor.execute(INSERT_TASK, self._insert_params(task))
+                except Exception as error:
+                    if not is_integrity_error(error):
+                        raise
+                    continue
+                task.id = cursor.lastrowid
+                added.append(task)
+        return added
+
+    def load_all(self, on_page=None):
+        """Loads every task into the in-memory store, reading and passing on_page FETCH_SIZE rows at a time.
+
+        Only the database reads are paged: the store and its indexes keep all the tasks, so memory grows with the task
+        count. Callers that only need to walk the tasks once use iter_pages, which holds a single page at a time.
+        """
+        self._reset_store()
+        self.set_today(datetime.today().date())
+        self.version += 1
+        self.query_cache.clear()
+
+        tasks = []
+        with self.backend.cursor() as cursor:
+            cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE user_id = %s ORDER BY due_date, id", (self.user_id,))
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                page = self._fetch_tasks(rows)
+                for task in page:
+                    self._index_task(task, ordered=False)
+                tasks.extend(page)
+                if on_page:
+                    on_page(page)
+        self.due_index.sort()
+        self.search_index.sort_tokens()
+        return tasks
+
+    def page_key(self, task):
+        return task.due_date.date(), task.id
+
+    def fetch_page(self, after=None, limit=PAGE_SIZE):
+        """Reads the tasks following the (due_date, id) key `after` from the database; returns them and the next key."""
+        if after is None:
+            tasks = self._query_tasks(f"SELECT {TASK_COLUMNS} FROM tasks WHERE user_id = %s ORDER BY due_date, id LIMIT %s",
+                                      (self.user_id, limit))
+        else:
+            due_date, task_id = after
+            tasks = self._query_tasks(f"SELECT {TASK_COLUMNS} FROM tasks WHERE user_id = %s "
+                                      "AND (due_date > %s OR (due_date = %s AND id > %s)) ORDER BY due_date, id LIMIT %s",
+                                      (self.user_id, due_date, due_date, task_id, limit))
+        return tasks, self.page_key(tasks[-1]) if len(tasks) == limit else None
+
+    def iter_pages(self, limit=PAGE_SIZE):
+        """Yields the tasks page by page in (due_date, id) order, straight from the database and without the store."""
+        after = None
+        while True:
+            tasks, after = self.fetch_page(after, limit)
+            if tasks:
+                yield tasks
+            if after is None:
+                return
+
+    def page_tasks(self, after=None, limit=PAGE_SIZE, start=None, end=None):
+        """Same ordering as fetch_page, served from the due date index; start and end bound the due dates as in tasks_due_between."""
+        low = 0 if start is None else bisect_right(self.due_index, (start.toordinal(), float("inf")))
+        high = len(self.due_index) if end is None else bisect_right(self.due_index, (end.toordinal(), float("inf")))
+        if after is not None:
+            low = max(low, bisect_right(self.due_index, (after[0].toordinal(), after[1])))
+        keys = self.due_index[low:min(high, low + limit)]
+        tasks = [self.tasks[task_id] for _, task_id in keys]
+        return tasks, self.page_key(tasks[-1]) if tasks and low + limit < high else None
+
+    def _fetch_tasks(self, rows):
+        tasks = []
+        for id, title, due_date, priority, comments, status in rows:
+            due_date = datetime.combine(due_date, datetime.min.time())
+            tasks.append(Task(id, title, due_date, priority, comments, status))
+        return tasks
+
+    def _query_tasks(self, query, params):
+        with self.backend.cursor() as cursor:
+            cursor.execute(query, params)
+            return self._fetch_tasks(cursor.fetchall())
 
-        if due_date <= today:
-            self.tasks_day.append(task)
-        if due_date <= (today + timedelta(days=7)):
-            self.tasks_week.append(task)
-        if due_date <= (today + timedelta(days=30)):
-            self.tasks_month.append(task)
-
-        cursor.execute("INSERT INTO tasks (user_id, title, due_date, priority, comments, status) VALUES (%s, %s, %s, %s, %s, %s)",
-                    (self.user_id, task.title, task.due_date, task.priority, task.comments, task.status))
-        db_connection.commit()
-        
     def update_task(self, task):
-        cursor.execute("UPDATE tasks SET title = %s, due_date = %s, priority = %s, comments = %s, status = %s WHERE id = %s",
-                       (task.title, task.due_date, task.priority, task.comments, task.status, task.id))
-        db_connection.commit()
+        if self.tasks_by_title.get(title_key(task.title), task.id) != task.id:
+            return False
+
+        try:
+            self.update_tasks([task])
+        except Exception as error:
+            if is_integrity_error(error):
+                return False
+            raise
+        return True
+
+    def update_tasks(self, tasks):
+        with self.backend.cursor(commit=True) as cursor:
+            cursor.executemany("UPDATE tasks SET title = %s, due_date = %s, priority = %s, comments = %s, status = %s, "
+                               "completed_at = CASE WHEN %s = 'Completed' THEN COALESCE(completed_at, CURRENT_TIMESTAMP) ELSE NULL END, "
+                               "version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                               [(task.title, task.due_date.date(), task.priority, task.comments, task.status, task.status, task.id) for task in tasks])
+
+        self.version += 1
+        old_tasks = self._discard_from_store(tasks)
+        for task in tasks:
+            self._index_task(task)
+            old_task = old_tasks.get(task.id)
+            if old_task is None:
+                self._emit("added", task)
+            elif self.bucket_for(old_task.due_date.date()) != self.bucket_for(task.due_date.date()):
+                self._emit("moved", task, old_task)
+            else:
+                self._emit("updated", task, old_task)
 
     def remove_task(self, task):
-        cursor.execute("DELETE FROM tasks WHERE id = %s", (task.id,))
-        db_connection.commit()
+        self.remove_tasks([task])
+
+    def remove_tasks(self, tasks):
+        with self.backend.cursor(commit=True) as cursor:
+            cursor.executemany("DELETE FROM tasks WHERE id = %s", [(task.id,) for task in tasks])
+            cursor.executemany("INSERT INTO task_deletions (task_id, user_id) VALUES (%s, %s)", [(task.id, self.user_id) for task in tasks])
+
+        self.version += 1
+        for old_task in self._discard_from_store(tasks).values():
+            self._emit("removed", old_task)
+
+    def refresh_tasks(self, task_ids):
+        """Re-reads tasks changed outside this TaskManager (for example by replica sync) and emits their change events."""
+        task_ids = list(task_ids)
+        fresh = {}
+        for start in range(0, len(task_ids), BATCH_SIZE):
+            chunk = task_ids[start:start + BATCH_SIZE]
+            fresh.update((task.id, task) for task in self._query_tasks(
+                f"SELECT {TASK_COLUMNS} FROM tasks WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(chunk))})",
+                (self.user_id, *chunk)))
+
+        self.version += 1
+        for task_id in task_ids:
+            old_task, task = None, fresh.get(task_id)
+            if task_id in self.tasks:
+                old_task = self._unindex_task(task_id)
+            if task:
+                self._index_task(task)
+            if old_task is None and task:
+                self._emit("added", task)
+            elif task is None and old_task:
+                self._emit("removed", old_task)
+            elif task and self.bucket_for(old_task.due_date.date()) != self.bucket_for(task.due_date.date()):
+                self._emit("moved", task, old_task)
+            elif task:
+                self._emit("updated", task, old_task)
+
+    def _discard_from_store(self, tasks):
+        return {task.id: self._unindex_task(task.id) for task in tasks if task.id in self.tasks}
+
+    def iter_tasks(self):
+        with self.backend.cursor() as cursor:
+            cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE user_id = %s ORDER BY id", (self.user_id,))
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                yield from self._fetch_tasks(rows)
+
+    def _cached(self, key, query, *args):
+        version = self.version
+        result = self.query_cache.get(key, version)
+        if result is None:
+            result = query(*args)
+            self.query_cache.put(key, version, result)
+        return list(result)
+
+    def get_cache_stats(self):
+        return self.query_cache.stats()
+
+    def filter_tasks(self, keyword, in_memory=True):
+        return self._cached(("filter", keyword, in_memory), self._filter_tasks, keyword, in_memory)
+
+    def _filter_tasks(self, keyword, in_memory):
+        if in_memory:
+            if keyword:
+                return self.search(keyword, FILTER_FIELDS)
+            return list(self.tasks.values())
+
+        if keyword:
+            return self._query_tasks(f"SELECT {TASK_COLUMNS} FROM tasks WHERE (title LIKE %s OR due_date LIKE %s OR priority LIKE %s OR status LIKE %s) AND user_id = %s",
+                                     (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", self.user_id))
+        return [task for page in self.iter_pages(FETCH_SIZE) for task in page]
+
+    def matches_filter(self, task, keyword):
+        """Whether filter_tasks(keyword) would include the task."""
+        return not keyword or self.search_index.matches(task.id, keyword, FILTER_FIELDS)
 
     def filter_tasks_by_title(self, keyword):
-        cursor.execute("SELECT * FROM tasks WHERE (title LIKE %s OR comments LIKE %s) AND user_id = %s",
-                       (f"%{keyword}%", f"%{keyword}%", self.user_id))
-        return self._fetch_tasks(cursor.fetchall())
+        return self._cached(("title", keyword), self.search, keyword, TEXT_FIELDS)
 
     def filter_tasks_by_due_date(self, keyword):
         try:
             due_date = datetime.strptime(keyword, "%Y-%m-%d").date()
-            cursor.execute("SELECT * FROM tasks WHERE due_date = %s AND user_id = %s", (due_date, self.user_id))
-            return self._fetch_tasks(cursor.fetchall())
         except ValueError:
             return []
+        return self._cached(("due_date", due_date), self._query_tasks,
+                            f"SELECT {TASK_COLUMNS} FROM tasks WHERE due_date = %s AND user_id = %s", (due_date, self.user_id))
 
     def filter_tasks_by_priority(self, keyword):
-        cursor.execute("SELECT * FROM tasks WHERE priority = %s AND user_id = %s", (keyword, self.user_id))
-        return self._fetch_tasks(cursor.fetchall())
+        return self._cached(("priority", keyword), self._query_tasks,
+                            f"SELECT {TASK_COLUMNS} FROM tasks WHERE priority = %s AND user_id = %s", (keyword, self.user_id))
 
     def filter_tasks_by_status(self, keyword):
-        cursor.execute("SELECT * FROM tasks WHERE status = %s AND user_id = %s", (keyword, self.user_id))
-        return self._fetch_tasks(cursor.fetchall())
+        return self._cached(("status", keyword), self._query_tasks,
+                            f"SELECT {TASK_COLUMNS} FROM tasks WHERE status = %s AND user_id = %s", (keyword, self.user_id))
+
+    def get_statistics(self):
+        today = datetime.today().date()
+        if self.statistics is None or self.statistics.today != today:
+            statistics = TaskStatistics(today)
+            with self.backend.cursor() as cursor:
+                cursor.execute("SELECT status, priority, "
+                               "SUM(CASE WHEN due_date < %s AND status <> 'Completed' THEN 1 ELSE 0 END), "
+                               "SUM(CASE WHEN due_date <= %s THEN 1 ELSE 0 END), "
+                               "SUM(CASE WHEN due_date > %s AND due_date <= %s THEN 1 ELSE 0 END), "
+                               "SUM(CASE WHEN due_date > %s THEN 1 ELSE 0 END), "
+                               "COUNT(*) FROM tasks WHERE user_id = %s GROUP BY status, priority",
+                               (today, today, today, statistics.week_end, statistics.week_end, self.user_id))
+                statistics.load(cursor.fetchall())
+            self.statistics = statistics
+        return self.statistics.snapshot()
+
+    def get_completions_per_week(self, weeks=WEEKLY_TREND_WEEKS):
+        # completed_at is written with the database clock, so the weeks are counted in that clock too.
+        today = self.backend.today()
+        first_week = today - timedelta(days=today.weekday() + 7 * (weeks - 1))
+        if self.weekly_completions is None or self.weekly_completions[0] != (first_week, weeks):
+            week_start = self.backend.week_start("completed_at")
+            with self.backend.cursor() as cursor:
+                cursor.execute(f"SELECT {week_start} AS completed_week, COUNT(*) FROM tasks "
+                               "WHERE user_id = %s AND completed_at >= %s GROUP BY completed_week",
+                               (self.user_id, first_week))
+                counts = {week if isinstance(week, date) else date.fromisoformat(week): count for week, count in cursor.fetchall()}
+            trend = [(first_week + timedelta(weeks=index), counts.get(first_week + timedelta(weeks=index), 0))
+                     for index in range(weeks)]
+            self.weekly_completions = ((first_week, weeks), trend)
+        return self.weekly_completions[1]
 
     def get_completed_tasks_count(self):
-        cursor.execute("SELECT COUNT(*) FROM tasks WHERE status = 'Completed' AND user_id = %s", (self.user_id,))
-        return cursor.fetchone()[0]
+        return self.get_statistics()["status"]["Completed"]
 
     def get_inprogress_tasks_count(self):
-        cursor.execute("SELECT COUNT(*) FROM tasks WHERE status = 'In Progress' AND user_id = %s", (self.user_id,))
-        return cursor.fetchone()[0]
+        return self.get_statistics()["status"]["In Progress"]
 
     def get_pending_tasks_count(self):
-        cursor.execute("SELECT COUNT(*) FROM tasks WHERE status = 'Pending' AND user_id = %s", (self.user_id,))
-        return cursor.fetchone()[0]
+        return self.get_statistics()["status"]["Pending"]
 
 class TaskManagerApp:
     def __init__(self, user_id, username):
@@ -96,6 +614,16 @@ class TaskManagerApp:
         self.user_label = tk.Label(self.root, text=f"User: {self.username}", font=("Helvetica", 12))
         self.user_label.pack(ipady=2)
 
+        self.loading_label = tk.Label(self.root, text="", fg="gray")
+        self.loading_label.pack()
+        self.worker = BackgroundWorker(self.root, on_busy_change=self.show_loading)
+        self.filter_keyword = ""
+        # Whether a changed task belongs in the filtered view is decided on the thread that changed the store.
+        self.task_manager.subscribe(lambda event, task, old_task: self.worker.dispatch(
+            self.apply_change, event, task, old_task, self.task_manager.matches_filter(task, self.filter_keyword)))
+        self.statistics_panel = None
+        self.sync = None
+
         self.tabControl = ttk.Notebook(self.root)
         self.tab_day = ttk.Frame(self.tabControl)
         self.tab_week = ttk.Frame(self.tabControl)
@@ -114,21 +642,87 @@ class TaskManagerApp:
 
         self.add_buttons()
         self.load_tasks()
+        self.schedule_rollover()
 
         self.create_search_bar()
-        
+        if isinstance(self.task_manager.backend, ReplicaBackend):
+            self.start_sync()
+
+    def start_sync(self):
+        from replica import ReplicaSync
+
+        sync_frame = tk.Frame(self.root)
+        sync_frame.pack(before=self.tabControl)
+        self.sync_label = tk.Label(sync_frame, text="Connecting...", fg="gray")
+        self.sync_label.pack(side="left")
+        self.conflicts_button = tk.Button(sync_frame, text="Conflicts", command=self.open_conflicts_window)
+        self.conflicts_window = None
+        self.sync = ReplicaSync(self.task_manager.backend, self.user_id,
+                                on_change=lambda task_ids: self.worker.dispatch(self.on_synced, task_ids),
+                                on_status=lambda status: self.worker.dispatch(self.show_sync_status, status))
+        self.task_manager.subscribe(lambda *change: self.sync.request())
+        self.sync.start()
+
+    def on_synced(self, task_ids):
+        self.worker.submit(None, self.task_manager.refresh_tasks, task_ids)
+
+    def show_sync_status(self, status):
+        from replica import status_text
+
+        self.sync_label.config(text=status_text(status), fg="gray" if status["online"] else "red")
+        if status["conflicts"]:
+            self.conflicts_button.pack(side="left", padx=5)
+        else:
+            self.conflicts_button.pack_forget()
+        if self.conflicts_window and self.conflicts_window.winfo_exists():
+            self.load_conflicts()
+
+    def open_conflicts_window(self):
+        if self.conflicts_window is None or not self.conflicts_window.winfo_exists():
+            self.conflicts_window = tk.Toplevel(self.root)
+            self.conflicts_window.title("Sync Conflicts")
+            tk.Label(self.conflicts_window, text="These local changes lost to newer changes on the server:").pack(padx=5, pady=5)
+
+            self.conflicts_tree = ttk.Treeview(self.conflicts_window, columns=CONFLICT_COLUMNS, show="headings")
+            for column in CONFLICT_COLUMNS:
+                self.conflicts_tree.heading(column, text=column)
+            self.conflicts_tree.pack(fill="both", expand=True, padx=5)
+
+            button_frame = tk.Frame(self.conflicts_window)
+            button_frame.pack(pady=5)
+            tk.Button(button_frame, text="Dismiss Selected",
+                      command=lambda: self.dismiss_conflicts([int(item) for item in self.conflicts_tree.selection()])).grid(row=0, column=0, padx=5)
+            tk.Button(button_frame, text="Dismiss All", command=lambda: self.dismiss_conflicts(None)).grid(row=0, column=1, padx=5)
+        self.conflicts_window.lift()
+        self.load_conflicts()
+
+    def load_conflicts(self):
+        self.worker.submit("conflicts", self.sync.conflicts, on_success=self.show_conflicts)
+
+    def show_conflicts(self, conflicts):
+        if not (self.conflicts_window and self.conflicts_window.winfo_exists()):
+            return
+        self.conflicts_tree.delete(*self.conflicts_tree.get_children())
+        for conflict in conflicts:
+            self.conflicts_tree.insert("", "end", iid=str(conflict["id"]), values=(
+                conflict["detected_at"], conflict["operation"], conflict["reason"], conflict["local_title"] or "",
+                conflict["local_due_date"] or "", conflict["local_status"] or ""))
+
+    def dismiss_conflicts(self, conflict_ids):
+        if conflict_ids == []:
+            return
+        self.worker.submit(None, self.sync.dismiss_conflicts, conflict_ids, on_success=self.show_sync_status)
+
     def create_task_table(self, tab, tab_text):
-        tree = ttk.Treeview(tab, columns=("Task Name", "Due Date", "Priority", "Comments", "Status"), show="headings")
-        tree.heading("Task Name", text="Task Name")
-        tree.heading("Due Date", text="Due Date")
-        tree.heading("Priority", text="Priority")
-        tree.heading("Comments", text="Comments")
-        tree.heading("Status", text="Status")
-        tree.pack(fill="both", expand=True)
+        table = VirtualTable(tab, TABLE_COLUMNS, self.task_values)
+        table.pack(fill="both", expand=True)
 
-        tree.bind("<<TreeviewSelect>>", self.bind_select_event)
+        table.tree.bind("<<TreeviewSelect>>", self.bind_select_event)
 
-        self.tables[tab_text] = tree 
+        self.tables[tab_text] = table
+
+    def task_values(self, task):
+        return (task.title, task.due_date.strftime('%Y-%m-%d'), task.priority, task.comments, task.status)
 
     def bind_select_event(self, event):
         selected_items = event.widget.selection()
@@ -136,19 +730,7 @@ class TaskManagerApp:
             return  
 
         selected_item = selected_items[0]  
-        values = event.widget.item(selected_item, 'values')
-        if not values:
-            return  
-        title, due_date_str, priority, comments, status = values
-        due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
-        
-        cursor.execute("SELECT id FROM tasks WHERE title = %s AND due_date = %s AND priority = %s AND comments = %s AND status = %s",
-                    (title, due_date, priority, comments, status))
-        task_id = cursor.fetchone()
-        if task_id:
-            self.selected_task = Task(task_id[0], title, due_date, priority, comments, status)
-        else:
-            self.selected_task = Task(None, title, due_date, priority, comments, status)
+        self.selected_task = self.task_manager.get_task(int(selected_item))
 
     def add_buttons(self):
         button_frame = tk.Frame(self.root)
@@ -229,10 +811,15 @@ class TaskManagerApp:
             return
 
         new_task = Task(None, title, due_date, priority, comments, status)
-        self.task_manager.add_task(new_task)
+        self.worker.submit(None, self.task_manager.add_task, new_task,
+                           on_success=lambda added: self.on_task_added(new_task, added))
 
-        tab = self.get_tab_for_due_date(new_task.due_date.date())
-        self.display_task(new_task, tab)
+    def on_task_added(self, new_task, added):
+        if not added:
+            tk.messagebox.showerror("Error", "A task with this title already exists.")
+            return
+        if not self.add_window.winfo_exists():
+            return
 
         self.title_entry.delete(0, tk.END)
         self.date_entry.delete(0, tk.END)
@@ -241,18 +828,27 @@ class TaskManagerApp:
         self.status_var.set("Pending")
         self.add_window.destroy()
 
-    def get_tab_for_due_date(self, due_date):
-        today = datetime.today().date()
-        if due_date <= today:
-            return 'Day'
-        elif due_date <= (today + timedelta(days=7)):
-            return 'Week'
-        else:
-            return 'Month'
+    def schedule_rollover(self):
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        self.root.after(int((midnight - now).total_seconds() * 1000) + ROLLOVER_DELAY_MS, self.roll_over)
+
+    def roll_over(self):
+        self.worker.submit("rollover", self.task_manager.roll_over, on_success=self.apply_rollover)
+        self.schedule_rollover()
+
+    def apply_rollover(self, moved):
+        for task, old_tab, new_tab in moved:
+            if self.tables[old_tab].remove(task.id):
+                self.display_task(task, new_tab)
+        if self.statistics_panel and self.statistics_panel.winfo_exists():
+            self.refresh_statistics()
+
+    def get_tab_for_due_date(self, due_date, today=None):
+        return self.task_manager.bucket_for(due_date, today)
 
     def display_task(self, task, tab):
-        tree = self.tables[tab]
-        tree.insert("", "end", values=(task.title, task.due_date.strftime('%Y-%m-%d'), task.priority, task.comments, task.status))
+        self.tables[tab].append(task)
 
     def edit_task(self):
         if not hasattr(self, 'selected_task') or not self.selected_task:
@@ -312,137 +908,137 @@ class TaskManagerApp:
             tk.messagebox.showerror("Error", "Invalid date format. Please use YYYY-MM-DD.")
             return
 
-        self.selected_task.title = title
-        self.selected_task.due_date = due_date
-        self.selected_task.priority = priority
-        self.selected_task.comments = comments
-        self.selected_task.status = status
-
-        self.task_manager.update_task(self.selected_task)
+        task = Task(self.selected_task.id, title, due_date, priority, comments, status)
+        self.worker.submit(None, self.task_manager.update_task, task,
+                           on_success=lambda updated: self.on_task_updated(task, updated))
 
-        for tree in self.tables.values():
-            tree.delete(*tree.get_children())
-
-        self.load_tasks()
+    def on_task_updated(self, task, updated):
+        if not updated:
+            tk.messagebox.showerror("Error", "A task with this title already exists.")
+            return
 
-        self.edit_window.destroy()
+        self.selected_task = task
+        if self.edit_window.winfo_exists():
+            self.edit_window.destroy()
 
     def remove_task(self):
         if not hasattr(self, 'selected_task') or not self.selected_task:
             tk.messagebox.showwarning("Warning", "Please select a task to remove.")
             return
 
-        for tab_text, tree in self.tables.items():
-            for item in tree.get_children():
-                values = tree.item(item, 'values')
-                if values and values[0] == self.selected_task.title:
-                    tree.delete(item)
-
-        self.task_manager.remove_task(self.selected_task)
+        self.worker.submit(None, self.task_manager.remove_task, self.selected_task)
 
         del self.selected_task
 
     def load_tasks(self):
-        cursor.execute("SELECT * FROM tasks WHERE user_id = %s", (self.user_id,))
-        tasks = cursor.fetchall()
-        for task in tasks:
-            id, user_id, title, due_date, priority, comments, status = task
-            due_date = datetime.combine(due_date, datetime.min.time())
-            loaded_task = Task(id, title, due_date, priority, comments, status)
-            self.task_manager.add_task(loaded_task)
-
-            tab = self.get_tab_for_due_date(loaded_task.due_date.date())
-            self.display_task(loaded_task, tab)
+        load = self.loading_tasks = object()
+        self.filter_keyword = ""
+        for table in self.tables.values():
+            table.set_rows([])
+        self.worker.submit("tasks", self.task_manager.load_all, lambda page: self.worker.dispatch(self.show_page, load, page),
+                           on_success=self.show_tasks)
+
+    def show_page(self, load, tasks):
+        if load is not self.loading_tasks:
+            return
+        for tab_text, tasks in self.partition_by_tab(tasks).items():
+            self.tables[tab_text].extend(tasks)
 
     def filter_tasks(self):
-        keyword = self.search_entry.get()
+        self.loading_tasks = None
+        keyword = self.filter_keyword = self.search_entry.get()
+        self.worker.submit("tasks", self.task_manager.filter_tasks, keyword, on_success=self.show_tasks)
+
+    def show_tasks(self, tasks):
+        self.loading_tasks = None
+        for tab_text, tasks in self.partition_by_tab(tasks).items():
+            self.tables[tab_text].set_rows(tasks)
+
+    def apply_change(self, event, task, old_task, shown=True):
+        if event in ("removed", "moved"):
+            removed = old_task or task
+            self.tables[self.get_tab_for_due_date(removed.due_date.date())].remove(removed.id)
+        if event != "removed":
+            table = self.tables[self.get_tab_for_due_date(task.due_date.date())]
+            if not shown:
+                table.remove(task.id)
+            elif not table.replace(task):
+                table.append(task)
+
+        if self.statistics_panel and self.statistics_panel.winfo_exists():
+            self.refresh_statistics()
+
+    def show_loading(self, busy):
+        self.loading_label.config(text="Loading..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+
+    def partition_by_tab(self, tasks):
+        partitions = {tab_text: [] for tab_text in self.tables}
+        for task in tasks:
+            partitions[self.get_tab_for_due_date(task.due_date.date())].append(task)
+        return partitions
 
-        for tab_text, tree in self.tables.items():
-            tree.delete(*tree.get_children())
+    def reset_tasks(self):
+        self.load_tasks()
 
-            if keyword:
-                cursor.execute("SELECT * FROM tasks WHERE (title LIKE %s OR due_date LIKE %s OR priority LIKE %s OR status LIKE %s) AND user_id = %s",
-                               (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", self.user_id))
-            else:
-                cursor.execute("SELECT * FROM tasks WHERE user_id = %s", (self.user_id,))
+    def show_pie_chart(self):
+        if self.statistics_panel is None or not self.statistics_panel.winfo_exists():
+            from chart import StatisticsPanel
 
-            tasks = cursor.fetchall()
-            for task in tasks:
-                id, user_id, title, due_date, priority, comments, status = task
-                due_date = datetime.combine(due_date, datetime.min.time())
-                loaded_task = Task(id, title, due_date, priority, comments, status)
+            self.statistics_panel = StatisticsPanel(self.root)
+        self.statistics_panel.lift()
+        self.refresh_statistics()
 
-                if self.get_tab_for_due_date(loaded_task.due_date.date()) == tab_text:
-                    self.display_task(loaded_task, tab_text)
-                    
-    def reset_tasks(self):
-        for tab_text, tree in self.tables.items():
-            tree.delete(*tree.get_children())
+    def refresh_statistics(self):
+        self.worker.submit("chart", self.get_chart_data, on_success=self.draw_statistics)
 
-        self.load_tasks()
+    def get_chart_data(self):
+        return self.task_manager.get_statistics(), self.task_manager.get_completions_per_week()
 
-    def show_pie_chart(self):
-        completed = self.task_manager.get_completed_tasks_count()
-        in_progress = self.task_manager.get_inprogress_tasks_count()
-        pending = self.task_manager.get_pending_tasks_count()
-
-        labels = ['Completed', 'In Progress', 'Pending']
-        sizes = [completed, in_progress, pending]
-        colors = ['lightgreen', 'lightblue', 'lightcoral']
-        explode = (0.1, 0, 0)
-
-        plt.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%', shadow=True, startangle=140)
-        plt.axis('equal')
-        plt.title('Task Completion Status')
-        plt.show()
+    def draw_statistics(self, data):
+        if self.statistics_panel and self.statistics_panel.winfo_exists():
+            self.statistics_panel.update_data(*data)
         
     def open_sort_window(self):
         sort_window = tk.Toplevel(self.root)
         sort_window.title("Sort Tasks")
 
         tk.Label(sort_window, text="Sort by:").grid(row=0, column=0, padx=5, pady=5)
+        tk.Label(sort_window, text="Then by:").grid(row=0, column=1, padx=5, pady=5)
 
-        options = [("Due Date", "due_date"), ("Task Name", "title"), ("Status", "status"), ("Priority", "priority")]
         sort_criteria = tk.StringVar()
-        for i, (text, value) in enumerate(options):
+        then_criteria = tk.StringVar(value="")
+        for i, (text, value) in enumerate(SORT_OPTIONS):
             tk.Radiobutton(sort_window, text=text, variable=sort_criteria, value=value).grid(row=i+1, column=0, padx=5, pady=2, sticky="w")
+            tk.Radiobutton(sort_window, text=text, variable=then_criteria, value=value).grid(row=i+1, column=1, padx=5, pady=2, sticky="w")
+
+        descending = tk.BooleanVar(value=False)
+        then_descending = tk.BooleanVar(value=False)
+        tk.Checkbutton(sort_window, text="Descending", variable=descending).grid(row=len(SORT_OPTIONS)+1, column=0, padx=5, pady=2, sticky="w")
+        tk.Checkbutton(sort_window, text="Descending", variable=then_descending).grid(row=len(SORT_OPTIONS)+1, column=1, padx=5, pady=2, sticky="w")
+
+        def sort():
+            criteria = [(sort_criteria.get(), descending.get())]
+            if then_criteria.get() and then_criteria.get() != sort_criteria.get():
+                criteria.append((then_criteria.get(), then_descending.get()))
+            self.sort_tasks(criteria)
 
-        tk.Button(sort_window, text="Sort", command=lambda: self.sort_tasks(sort_criteria.get())).grid(row=len(options)+1, column=0, padx=5, pady=10)
+        tk.Button(sort_window, text="Sort", command=sort).grid(row=len(SORT_OPTIONS)+2, column=0, columnspan=2, padx=5, pady=10)
 
-    def sort_tasks(self, criterion):
-        if criterion:
+    def sort_tasks(self, criteria):
+        criteria = [(field, descending) for field, descending in criteria if field]
+        if criteria:
             current_tab = self.tabControl.select()
-            tree = self.tables[self.tabControl.tab(current_tab, "text")]
-
-            tasks = []
-            for item in tree.get_children():
-                values = tree.item(item, 'values')
-                if values:
-                    title, due_date_str, priority, comments, status = values
-                    due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
-                    task = Task(None, title, due_date, priority, comments, status)
-                    tasks.append(task)
-                    
-            if criterion == "title":
-                tasks.sort(key=attrgetter('title'))
-            elif criterion == "status":
-                tasks.sort(key=lambda x: ('Pending', 'In Progress', 'Completed').index(x.status))
-            elif criterion == "due_date":
-                tasks.sort(key=attrgetter('due_date'))
-            elif criterion == "priority":
-                tasks.sort(key=lambda x: ('Normal', 'Medium', 'High').index(x.priority))
-
-            tree.delete(*tree.get_children())
-
-            for task in tasks:
-                tree.insert("", "end", values=(task.title, task.due_date.strftime('%Y-%m-%d'), task.priority, task.comments, task.status))
+            table = self.tables[self.tabControl.tab(current_tab, "text")]
+            table.set_rows(sort_tasks(list(table.rows.values()), criteria))
 
     def run(self):
         self.root.mainloop()
+        if self.sync:
+            self.sync.stop()
+        self.worker.shutdown()
 
 if __name__ == "__main__":
-    db_connection = db_connection()
-    cursor = db_connection.cursor()
     user_id = 1
     username = "example_user"
     app = TaskManagerApp(user_id, username)
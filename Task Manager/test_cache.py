@@ -0,0 +1,37 @@
+"""
+Program: test_cache.py
+Tests for the versioned LRU cache in cache.py.
+Usage: python -m unittest test_cache   (or python -m pytest test_cache.py)
+"""
+
+import unittest
+from cache import QueryCache
+
+
+class QueryCacheTest(unittest.TestCase):
+    def test_entries_from_an_older_version_are_dropped(self):
+        cache = QueryCache()
+        cache.put("report", 1, ["a"])
+        self.assertEqual(cache.get("report", 1), ["a"])
+        self.assertIsNone(cache.get("report", 2))
+        self.assertIsNone(cache.get("report", 1))
+        self.assertEqual({key: cache.stats()[key] for key in ("hits", "misses", "stale", "entries", "rows")},
+                         {"hits": 1, "misses": 2, "stale": 1, "entries": 0, "rows": 0})
+
+    def test_least_recently_used_entries_are_evicted_first(self):
+        cache = QueryCache(max_entries=2, max_rows=4)
+        cache.put("a", 1, [1])
+        cache.put("b", 1, [1])
+        cache.get("a", 1)
+        cache.put("c", 1, [1])
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+        cache.put("d", 1, [1, 2, 3])
+        self.assertEqual(list(cache.entries), ["c", "d"])
+        cache.put("e", 1, [1, 2, 3, 4, 5])
+        self.assertEqual(list(cache.entries), ["c", "d"])
+        self.assertEqual((cache.stats()["evictions"], cache.stats()["rows"]), (2, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
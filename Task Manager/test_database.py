@@ -0,0 +1,47 @@
+"""
+Program: test_database.py
+Tests for the connection pool in database.py, run against a temporary SQLite database.
+Usage: python -m unittest test_database   (or python -m pytest test_database.py)
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from migrate import apply_migrations
+from storage import SQLiteBackend
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "tasks.db")
+        self.reader = SQLiteBackend(path)
+        self.writer = SQLiteBackend(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            apply_migrations(self.reader)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        self.directory.cleanup()
+
+    def count_users(self, cursor):
+        cursor.execute("SELECT COUNT(*) FROM users")
+        return cursor.fetchall()[0][0]
+
+    def test_read_only_checkout_does_not_keep_its_snapshot(self):
+        # SQLite only holds a snapshot inside an explicit transaction; MySQL does after any SELECT.
+        with self.reader.cursor() as cursor:
+            cursor.execute("BEGIN")
+            self.assertEqual(self.count_users(cursor), 0)
+        with self.writer.cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO users (username) VALUES ('alice')")
+
+        with self.reader.cursor() as cursor:
+            self.assertEqual(self.count_users(cursor), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Program: test_migrate.py
+Tests for migrate.py, run against a temporary SQLite database.
+Usage: python -m unittest test_migrate   (or python -m pytest test_migrate.py)
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+import migrate
+from storage import SQLiteBackend
+
+
+class ApplyMigrationsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.directory.name, "tasks.db"))
+
+    def tearDown(self):
+        self.backend.close()
+        self.directory.cleanup()
+
+    def applied_versions(self):
+        with self.backend.cursor() as cursor:
+            return migrate.get_applied_versions(cursor)
+
+    def test_failed_migration_resumes_after_the_last_applied_statement(self):
+        migrations = migrate.get_migrations(self.backend)
+        with mock.patch("migrate.get_migrations", return_value=migrations[:1]):
+            migrate.apply_migrations(self.backend)
+        with self.backend.cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO users (username) VALUES ('alice')")
+            cursor.executemany("INSERT INTO tasks (user_id, title) VALUES (1, %s)", [("report",), ("report",)])
+
+        with self.assertRaises(Exception):
+            migrate.apply_migrations(self.backend)
+        with self.backend.cursor() as cursor:
+            self.assertEqual(migrate.get_progress(cursor), {2: 3})
+        self.assertNotIn(2, self.applied_versions())
+
+        with self.backend.cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM tasks WHERE id = 2")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            migrate.apply_migrations(self.backend)
+        self.assertIn("Resuming migration 002_task_indexes.sql after statement 3 of 4", output.getvalue())
+        self.assertEqual(self.applied_versions(), {version for version, _, _ in migrations})
+        with self.backend.cursor() as cursor:
+            self.assertEqual(migrate.get_progress(cursor), {})
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = 'uq_tasks_user_title'")
+            self.assertEqual(len(cursor.fetchall()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
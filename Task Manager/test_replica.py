@@ -0,0 +1,206 @@
+"""
+Program: test_replica.py
+Tests for replica.py, using a second SQLite database as a local stand-in for the server.
+Usage: python -m unittest test_replica   (or python -m pytest test_replica.py)
+"""
+
+import os
+import tempfile
+import unittest
+from migrate import apply_migrations
+from replica import ReplicaSync, prepare_replica
+from storage import ReplicaBackend, SQLiteBackend
+from taskManager import TaskManager
+from test_taskmanager import assert_store_consistent, new_task
+import users
+
+
+def snapshot(backend, user_id):
+    with backend.cursor() as cursor:
+        cursor.execute("SELECT title, due_date, priority, comments, status FROM tasks WHERE user_id = %s ORDER BY title", (user_id,))
+        return cursor.fetchall()
+
+
+class ReplicaSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.remote = SQLiteBackend(os.path.join(self.directory.name, "server.db"))
+        apply_migrations(self.remote)
+        self.user_id = users.insert_user(self.remote, "alice")
+        self.server = TaskManager(self.user_id, self.remote)
+        self.server.load_all()
+        self.server.add_tasks([new_task(f"task {i}") for i in range(3)])
+
+        self.local = ReplicaBackend(os.path.join(self.directory.name, "replica.db"), self.remote)
+        apply_migrations(self.local)
+        self.assertTrue(prepare_replica(self.local))
+        self.changes = []
+        self.sync = ReplicaSync(self.local, self.user_id, on_change=self.changes.append)
+        self.assertTrue(self.sync.sync())
+        self.client = TaskManager(self.user_id, self.local)
+        self.client.load_all()
+        self.client.get_statistics()
+
+    def tearDown(self):
+        self.local.close()
+        self.directory.cleanup()
+
+    def reload_server(self):
+        self.server.load_all()
+        self.server.get_statistics()
+
+    def assert_in_sync(self):
+        self.assertEqual(snapshot(self.local, self.user_id), snapshot(self.remote, self.user_id))
+
+    def test_initial_pull_copies_server_tasks_and_users(self):
+        self.assertEqual(sorted(task.title for task in self.client.tasks.values()), ["task 0", "task 1", "task 2"])
+        self.assertEqual(users.get_user_id(self.local, "alice"), self.user_id)
+        self.assert_in_sync()
+
+    def test_offline_changes_are_queued_and_pushed_later(self):
+        self.sync.remote = SQLiteBackend(os.path.join(self.directory.name, "missing", "server.db"))
+        self.client.add_task(new_task("written offline", priority="High"))
+        edited = self.client.find_by_title("task 1")
+        edited.comments = "edited offline"
+        self.client.update_task(edited)
+        self.client.remove_task(self.client.find_by_title("task 2"))
+        assert_store_consistent(self, self.client)
+
+        self.assertFalse(self.sync.sync())
+        self.assertEqual(self.sync.status()["pending"], 3)
+        self.assertEqual(len(snapshot(self.remote, self.user_id)), 3)
+
+        self.sync.remote = self.remote
+        self.assertTrue(self.sync.sync())
+        self.assertEqual(self.sync.status()["pending"], 0)
+        self.assertEqual(self.sync.status()["conflicts"], 0)
+        self.assert_in_sync()
+        self.reload_server()
+        self.assertEqual(self.server.find_by_title("task 1").comments, "edited offline")
+        self.assertIsNone(self.server.find_by_title("task 2"))
+
+    def test_pull_applies_server_updates_and_deletions(self):
+        self.reload_server()
+        updated = self.server.find_by_title("task 0")
+        updated.status = "Completed"
+        self.server.update_task(updated)
+        self.server.remove_task(self.server.find_by_title("task 1"))
+        self.server.add_task(new_task("added on server"))
+        assert_store_consistent(self, self.server)
+
+        self.changes.clear()
+        self.sync.sync()
+        self.client.refresh_tasks(set().union(*self.changes))
+        self.assertEqual(self.client.find_by_title("task 0").status, "Completed")
+        self.assertIsNone(self.client.find_by_title("task 1"))
+        self.assertIsNotNone(self.client.find_by_title("added on server"))
+        self.assert_in_sync()
+        assert_store_consistent(self, self.client)
+
+    def test_pull_is_idempotent(self):
+        with self.local.cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM sync_cursors")
+        changed = set()
+        self.sync.pull(changed)
+        self.assertEqual(changed, set())
+        self.assert_in_sync()
+
+    def test_concurrent_update_keeps_server_version_and_records_conflict(self):
+        self.reload_server()
+        remote_task = self.server.find_by_title("task 0")
+        remote_task.comments = "server"
+        self.server.update_task(remote_task)
+        local_task = self.client.find_by_title("task 0")
+        local_task.comments = "local"
+        self.client.update_task(local_task)
+        assert_store_consistent(self, self.server)
+        assert_store_consistent(self, self.client)
+
+        self.sync.sync()
+        self.client.load_all()
+        self.assertEqual(self.client.find_by_title("task 0").comments, "server")
+        conflicts = self.sync.conflicts()
+        self.assertEqual([(conflict["operation"], conflict["local_comments"]) for conflict in conflicts], [("update", "local")])
+        self.assert_in_sync()
+
+    def test_update_of_task_deleted_on_server_removes_it_locally(self):
+        self.reload_server()
+        self.server.remove_task(self.server.find_by_title("task 0"))
+        local_task = self.client.find_by_title("task 0")
+        local_task.priority = "High"
+        self.client.update_task(local_task)
+
+        self.sync.sync()
+        self.assertEqual([conflict["reason"] for conflict in self.sync.conflicts()], ["The task was deleted on the server"])
+        self.assert_in_sync()
+
+    def test_delete_of_task_changed_on_server_restores_it(self):
+        self.reload_server()
+        remote_task = self.server.find_by_title("task 0")
+        remote_task.priority = "High"
+        self.server.update_task(remote_task)
+        self.client.remove_task(self.client.find_by_title("task 0"))
+
+        self.sync.sync()
+        self.client.load_all()
+        self.assertEqual(self.client.find_by_title("task 0").priority, "High")
+        self.assertEqual([conflict["operation"] for conflict in self.sync.conflicts()], ["delete"])
+        self.assert_in_sync()
+
+    def test_duplicate_title_keeps_server_task(self):
+        self.reload_server()
+        self.server.add_task(new_task("duplicate", priority="Normal"))
+        self.client.add_task(new_task("duplicate", priority="Medium"))
+
+        self.sync.sync()
+        self.client.load_all()
+        self.assertEqual(self.client.find_by_title("duplicate").priority, "Normal")
+        self.assertEqual([conflict["local_priority"] for conflict in self.sync.conflicts()], ["Medium"])
+        self.assert_in_sync()
+
+    def test_duplicate_title_in_other_case_keeps_server_task(self):
+        self.reload_server()
+        self.server.add_task(new_task("duplicate", priority="Normal"))
+        self.client.add_task(new_task("Duplicate", priority="Medium"))
+
+        self.sync.sync()
+        self.assertEqual([conflict["local_title"] for conflict in self.sync.conflicts()], ["Duplicate"])
+        self.assert_in_sync()
+
+    def test_identical_task_created_on_both_sides_is_adopted(self):
+        self.reload_server()
+        self.server.add_task(new_task("same"))
+        self.client.add_task(new_task("same"))
+
+        self.sync.sync()
+        self.assertEqual(self.sync.conflicts(), [])
+        self.assert_in_sync()
+
+        same = self.client.find_by_title("same")
+        same.status = "In Progress"
+        self.client.update_task(same)
+        assert_store_consistent(self, self.client)
+        self.sync.sync()
+        self.assertEqual(self.sync.conflicts(), [])
+        self.assert_in_sync()
+
+    def test_dismissed_conflicts_are_not_counted(self):
+        self.reload_server()
+        for title in ("task 0", "task 1"):
+            remote_task = self.server.find_by_title(title)
+            remote_task.comments = "server"
+            self.server.update_task(remote_task)
+            local_task = self.client.find_by_title(title)
+            local_task.comments = "local"
+            self.client.update_task(local_task)
+        self.sync.sync()
+        self.assertEqual(self.sync.status()["conflicts"], 2)
+
+        first = self.sync.conflicts()[0]
+        self.assertEqual(self.sync.dismiss_conflicts([first["id"]])["conflicts"], 1)
+        self.assertEqual(self.sync.dismiss_conflicts()["conflicts"], 0)
+        self.assertEqual(self.sync.conflicts(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
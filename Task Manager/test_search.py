@@ -0,0 +1,66 @@
+"""
+Program: test_search.py
+Tests for the inverted index in search.py.
+Usage: python -m unittest test_search   (or python -m pytest test_search.py)
+"""
+
+import unittest
+from search import SearchIndex, tokenize
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex({"title": 3, "comments": 1})
+        self.index.add(1, {"title": "Quarterly report", "comments": "send to finance"})
+        self.index.add(2, {"title": "Reply to Ana", "comments": "about the report"})
+        self.index.add(3, {"title": "Repair bike", "comments": ""})
+
+    def test_tokenize_lowercases_and_splits_on_non_word_characters(self):
+        self.assertEqual(tokenize("Send the Q3-report, now!"), ["send", "the", "q3", "report", "now"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_prefix_matches_are_ranked_by_field_weight(self):
+        # "reply" in the title and "report" in the comments outweigh one title match; ties go by id.
+        self.assertEqual(self.index.search("rep"), [2, 1, 3])
+        self.assertEqual(self.index.search("report"), [1, 2])
+        self.assertEqual(self.index.search("report", fields=("comments",)), [2])
+
+    def test_exact_matches_rank_above_prefix_matches(self):
+        self.index.add(4, {"title": "Reports archive", "comments": ""})
+        self.assertEqual(self.index.search("report")[:2], [1, 4])
+        self.index.add(5, {"title": "", "comments": "reports"})
+        self.assertEqual(self.index.search("report"), [1, 4, 2, 5])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.index.search("report finance"), [1])
+        self.assertEqual(self.index.search("report bike"), [])
+        self.assertEqual(self.index.search(""), [])
+
+    def test_remove_and_re_add_update_postings_and_tokens(self):
+        self.index.remove(3)
+        self.assertEqual(self.index.search("rep"), [2, 1])
+        self.assertNotIn("repair", self.index.sorted_tokens)
+        self.assertNotIn("bike", self.index.postings)
+
+        self.index.add(1, {"title": "Budget", "comments": ""})
+        self.assertEqual(self.index.search("report"), [2])
+        self.assertEqual(self.index.search("budget"), [1])
+        self.assertEqual(self.index.sorted_tokens, sorted(self.index.postings))
+
+    def test_unordered_adds_match_after_sort_tokens(self):
+        index = SearchIndex({"title": 1})
+        for doc_id, title in enumerate(["zeta", "alpha", "beta alphabet"], 1):
+            index.add(doc_id, {"title": title}, ordered=False)
+        index.sort_tokens()
+        self.assertEqual(index.sorted_tokens, ["alpha", "alphabet", "beta", "zeta"])
+        self.assertEqual(index.search("alp"), [2, 3])
+
+    def test_matches_agrees_with_search(self):
+        for query in ("rep", "report", "report finance", "ana rep", "bike", "", "zzz"):
+            for fields in (None, ("comments",)):
+                expected = set(self.index.search(query, fields))
+                self.assertEqual({doc_id for doc_id in (1, 2, 3) if self.index.matches(doc_id, query, fields)}, expected, (query, fields))
+
+
+if __name__ == "__main__":
+    unittest.main()
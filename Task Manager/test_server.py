@@ -0,0 +1,83 @@
+"""
+Program: test_server.py
+Tests for the TaskService behind server.py, run against a temporary SQLite database.
+Usage: python -m unittest test_server   (or python -m pytest test_server.py)
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from http import HTTPStatus
+from unittest import mock
+from migrate import apply_migrations
+from server import HTTPError, TaskService
+from storage import SQLiteBackend
+from taskManager import TaskManager
+from test_taskmanager import new_task
+import users
+
+
+class TaskServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.directory.name, "tasks.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            apply_migrations(self.backend)
+        self.user_id = users.insert_user(self.backend, "alice")
+        self.other = TaskManager(self.user_id, self.backend)
+        self.other.load_all()
+        self.other.add_tasks([new_task("report"), new_task("notes")])
+        self.service = TaskService(self.backend)
+        self.titles()
+
+    def tearDown(self):
+        self.backend.close()
+        self.directory.cleanup()
+
+    def titles(self):
+        _, body = self.service.list_tasks(self.user_id, {"page": ["1"]})
+        return sorted(task["title"] for task in body["tasks"])
+
+    def test_changes_made_by_other_clients_are_picked_up(self):
+        notes = self.other.find_by_title("notes")
+        notes.title = "minutes"
+        self.other.update_task(notes)
+        self.other.remove_task(self.other.find_by_title("report"))
+        self.other.add_task(new_task("ideas"))
+
+        with mock.patch("server.FRESHNESS_INTERVAL", 0):
+            self.assertEqual(self.titles(), ["ideas", "minutes"])
+            with self.assertRaises(HTTPError) as error:
+                self.service.update_task(self.user_id, notes.id, {"title": "ideas", "due_date": "2026-10-20"})
+            self.assertEqual(error.exception.status, HTTPStatus.CONFLICT)
+
+            notes.comments = "changed twice within a second"
+            self.other.update_task(notes)
+            _, body = self.service.get_task(self.user_id, notes.id)
+            self.assertEqual(body["comments"], "changed twice within a second")
+
+    def test_changes_are_checked_at_most_once_per_interval(self):
+        self.other.add_task(new_task("ideas"))
+        self.assertEqual(self.titles(), ["notes", "report"])
+        with mock.patch("server.FRESHNESS_INTERVAL", 0):
+            self.assertEqual(self.titles(), ["ideas", "notes", "report"])
+
+    def test_sessions_in_use_are_not_evicted(self):
+        bob = users.insert_user(self.backend, "bob")
+        self.service.max_sessions = 1
+        with self.service.session(self.user_id) as task_manager:
+            self.service.list_tasks(bob, {"page": ["1"]})
+            self.assertIs(self.service.sessions[self.user_id].task_manager, task_manager)
+        self.assertEqual(set(self.service.sessions), {self.user_id, bob})
+
+        self.service.list_tasks(bob, {"page": ["1"]})
+        self.assertEqual(set(self.service.sessions), {self.user_id, bob})
+        carol = users.insert_user(self.backend, "carol")
+        self.service.list_tasks(carol, {"page": ["1"]})
+        self.assertEqual(set(self.service.sessions), {carol})
+
+
+if __name__ == "__main__":
+    unittest.main()
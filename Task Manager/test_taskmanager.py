@@ -0,0 +1,346 @@
+"""
+Program: test_taskmanager.py
+Tests for the TaskManager in-memory store, run against a temporary SQLite database.
+Usage: python -m unittest test_taskmanager   (or python -m pytest test_taskmanager.py)
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from migrate import apply_migrations
+from storage import SQLiteBackend
+from taskManager import Task, TaskManager, sort_tasks
+import users
+
+DUE = datetime(2026, 10, 20)
+
+
+def new_task(title, priority="Normal", comments="", status="Pending", due_date=DUE):
+    return Task(None, title, due_date, priority, comments, status)
+
+
+def _non_empty(index):
+    return {key: ids for key, ids in index.items() if ids}
+
+
+def assert_store_consistent(test, task_manager):
+    """Checks every index and counter of task_manager against a fresh load of the same user."""
+    fresh = TaskManager(task_manager.user_id, task_manager.backend)
+    fresh.load_all()
+    values = lambda manager: {task.id: (task.title, task.due_date, task.priority, task.comments, task.status)
+                              for task in manager.tasks.values()}
+    test.assertEqual(values(task_manager), values(fresh))
+    test.assertEqual(task_manager.tasks_by_title, fresh.tasks_by_title)
+    for index in ("tasks_by_status", "tasks_by_priority", "tasks_by_due_date"):
+        test.assertEqual(_non_empty(getattr(task_manager, index)), _non_empty(getattr(fresh, index)), index)
+    test.assertEqual(task_manager.due_index, fresh.due_index)
+    test.assertEqual(task_manager.search_index.doc_tokens, fresh.search_index.doc_tokens)
+    test.assertEqual(task_manager.search_index.sorted_tokens, fresh.search_index.sorted_tokens)
+    if task_manager.statistics:
+        test.assertEqual(task_manager.statistics.snapshot(), fresh.get_statistics())
+
+
+class TaskManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.directory.name, "tasks.db"))
+        apply_migrations(self.backend)
+        self.user_id = users.insert_user(self.backend, "alice")
+        self.task_manager = TaskManager(self.user_id, self.backend)
+        self.task_manager.load_all()
+        self.events = []
+        self.task_manager.subscribe(lambda event, task, old_task: self.events.append((event, task, old_task)))
+
+    def tearDown(self):
+        self.backend.close()
+        self.directory.cleanup()
+
+
+class TaskTest(unittest.TestCase):
+    def test_sort_keys_follow_assigned_fields(self):
+        first, second = new_task("first"), new_task("second", due_date=datetime(2026, 10, 21))
+        first.due_date = datetime(2026, 10, 22)
+        first.priority = "High"
+        second.status = "Completed"
+
+        self.assertEqual(sort_tasks([first, second], [("due_date", False)]), [second, first])
+        self.assertEqual(sort_tasks([second, first], [("priority", True)]), [first, second])
+        self.assertEqual(sort_tasks([second, first], [("status", False)]), [first, second])
+        self.assertEqual((first.due_date, first.priority, second.status), (datetime(2026, 10, 22), "High", "Completed"))
+
+
+class StoreTest(TaskManagerTestCase):
+    def test_update_of_task_changed_in_place_moves_its_index_entries(self):
+        self.task_manager.add_task(new_task("report"))
+        self.task_manager.get_statistics()
+
+        task = self.task_manager.find_by_title("report")
+        task.status = "Completed"
+        task.title = "final report"
+        task.due_date = datetime(2026, 12, 1)
+        self.task_manager.update_task(task)
+
+        self.assertEqual(self.task_manager.find_by_status("Pending"), [])
+        self.assertEqual(self.task_manager.get_statistics()["status"]["Completed"], 1)
+        self.assertIsNone(self.task_manager.find_by_title("report"))
+        self.assertEqual(self.task_manager.search("report"), [task])
+        self.assertEqual(self.task_manager.search("2026-10-20"), [])
+        event, _, old_task = self.events[-1]
+        self.assertEqual((event, old_task.status, old_task.title), ("moved", "Pending", "report"))
+        assert_store_consistent(self, self.task_manager)
+
+    def test_remove_and_refresh_keep_store_consistent(self):
+        self.task_manager.add_tasks([new_task(f"task {i}") for i in range(5)])
+        self.task_manager.get_statistics()
+        self.task_manager.remove_task(self.task_manager.find_by_title("task 0"))
+
+        other = TaskManager(self.user_id, self.backend)
+        other.load_all()
+        changed = other.find_by_title("task 1")
+        changed.priority = "High"
+        other.update_task(changed)
+        other.remove_task(other.find_by_title("task 2"))
+        other.add_task(new_task("task 5"))
+
+        self.task_manager.refresh_tasks([changed.id, other.find_by_title("task 5").id,
+                                         self.task_manager.find_by_title("task 2").id])
+        self.assertEqual(self.task_manager.find_by_title("task 1").priority, "High")
+        self.assertIsNone(self.task_manager.find_by_title("task 2"))
+        assert_store_consistent(self, self.task_manager)
+
+    def test_duplicate_titles_are_case_insensitive(self):
+        self.assertTrue(self.task_manager.add_task(new_task("Report")))
+        self.assertFalse(self.task_manager.add_task(new_task("report")))
+        self.assertEqual([task.title for task in self.task_manager.add_tasks([new_task("REPORT"), new_task("notes")])], ["notes"])
+        assert_store_consistent(self, self.task_manager)
+
+    def test_add_tasks_skips_titles_only_the_database_knows(self):
+        self.task_manager.add_task(new_task("report"))
+        unloaded = TaskManager(self.user_id, self.backend)
+        added = unloaded.add_tasks([new_task("notes"), new_task("REPORT"), new_task("ideas")])
+
+        self.assertEqual([task.title for task in added], ["notes", "ideas"])
+        self.task_manager.load_all()
+        self.assertEqual({task.id for task in added}, {self.task_manager.find_by_title(title).id for title in ("notes", "ideas")})
+        self.assertEqual(len(self.task_manager.tasks), 3)
+
+    def test_matches_filter_agrees_with_filter_tasks(self):
+        self.task_manager.add_tasks([new_task("quarterly report", priority="High"), new_task("report draft", status="Completed"),
+                                     new_task("notes", comments="report"), new_task("ideas", due_date=datetime(2026, 11, 2))])
+        for keyword in ("", "report", "rep high", "completed", "2026-11", "notes report", "missing", "--"):
+            expected = {task.id for task in self.task_manager.filter_tasks(keyword)}
+            self.assertEqual({task.id for task in self.task_manager.tasks.values() if self.task_manager.matches_filter(task, keyword)},
+                             expected, keyword)
+
+    def test_completions_are_counted_in_the_clock_that_stamps_them(self):
+        self.task_manager.add_task(new_task("done", status="Completed"))
+        with self.backend.cursor() as cursor:
+            cursor.execute("SELECT completed_at FROM tasks")
+            completed_on = date.fromisoformat(cursor.fetchone()[0][:10])
+
+        trend = self.task_manager.get_completions_per_week()
+        self.assertEqual(trend[-1], (completed_on - timedelta(days=completed_on.weekday()), 1))
+        self.assertEqual(sum(count for _, count in trend), 1)
+
+    def test_rename_to_existing_title_is_refused(self):
+        self.task_manager.add_tasks([new_task("report"), new_task("notes")])
+        notes = self.task_manager.find_by_title("notes")
+        renamed = Task(notes.id, "Report", notes.due_date, "High", notes.comments, notes.status)
+        self.assertFalse(self.task_manager.update_task(renamed))
+        self.assertEqual(self.task_manager.get_task(notes.id).priority, "Normal")
+
+        renamed.title = "notes"
+        self.assertTrue(self.task_manager.update_task(renamed))
+        self.assertEqual(self.task_manager.get_task(notes.id).priority, "High")
+        assert_store_consistent(self, self.task_manager)
+
+
+class StatisticsTest(TaskManagerTestCase):
+    def setUp(self):
+        super().setUp()
+        today = datetime.combine(date.today(), datetime.min.time())
+        self.task_manager.add_tasks([
+            new_task("late", priority="High", due_date=today - timedelta(days=2)),
+            new_task("late but done", status="Completed", due_date=today - timedelta(days=1)),
+            new_task("today", priority="Medium", status="In Progress", due_date=today),
+            new_task("this week", due_date=today + timedelta(days=7)),
+            new_task("next week", priority="Medium", due_date=today + timedelta(days=8)),
+        ])
+        self.today = today
+
+    def test_counters_follow_adds_updates_and_removes(self):
+        statistics = self.task_manager.get_statistics()
+        self.assertEqual(statistics["buckets"], {"Day": 3, "Week": 1, "Month": 1})
+        self.assertEqual(statistics["overdue"], 1)
+        self.assertEqual(statistics["total"], 5)
+        self.assertEqual(statistics["status"]["Completed"], 1)
+
+        self.task_manager.add_task(new_task("overdue", status="In Progress", due_date=self.today - timedelta(days=3)))
+        late = self.task_manager.find_by_title("late")
+        late.status = "Completed"
+        self.task_manager.update_task(late)
+        week = self.task_manager.find_by_title("this week")
+        week.due_date = self.today + timedelta(days=30)
+        week.priority = "High"
+        self.task_manager.update_task(week)
+        self.task_manager.remove_task(self.task_manager.find_by_title("today"))
+
+        statistics = self.task_manager.get_statistics()
+        self.assertEqual(statistics["buckets"], {"Day": 3, "Week": 0, "Month": 2})
+        self.assertEqual(statistics["overdue"], 1)
+        self.assertEqual(statistics["total"], 5)
+        self.assertEqual(statistics["status"]["Completed"], 2)
+        self.assertEqual(statistics["priority"]["High"], 2)
+        assert_store_consistent(self, self.task_manager)
+
+    def test_counters_follow_refreshed_tasks(self):
+        self.task_manager.get_statistics()
+        other = TaskManager(self.user_id, self.backend)
+        other.load_all()
+        done = other.find_by_title("late but done")
+        done.status = "Pending"
+        other.update_task(done)
+        removed = other.find_by_title("next week")
+        other.remove_task(removed)
+        other.add_task(new_task("later", due_date=self.today + timedelta(days=3)))
+
+        self.task_manager.refresh_tasks([done.id, removed.id, other.find_by_title("later").id])
+        statistics = self.task_manager.get_statistics()
+        self.assertEqual(statistics["buckets"], {"Day": 3, "Week": 2, "Month": 0})
+        self.assertEqual(statistics["overdue"], 2)
+        self.assertEqual(statistics["status"]["Completed"], 0)
+        assert_store_consistent(self, self.task_manager)
+
+    def test_counters_are_reloaded_on_a_new_day(self):
+        self.task_manager.get_statistics()
+        self.task_manager.statistics.today -= timedelta(days=1)
+        self.task_manager.add_task(new_task("tomorrow", due_date=self.today + timedelta(days=1)))
+
+        statistics = self.task_manager.get_statistics()
+        self.assertEqual(self.task_manager.statistics.today, date.today())
+        self.assertEqual(statistics["buckets"], {"Day": 3, "Week": 2, "Month": 1})
+
+
+class RollOverTest(TaskManagerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task_manager.set_today(date(2026, 10, 18))
+        self.task_manager.add_tasks([new_task(f"due {day}", due_date=datetime(2026, 10, day)) for day in range(16, 31)])
+
+    def buckets(self, today=None):
+        return {task.id: self.task_manager.bucket_for(task.due_date.date(), today) for task in self.task_manager.tasks.values()}
+
+    def check_roll_over(self, today):
+        before = self.buckets()
+        moved = self.task_manager.roll_over(today)
+        after = self.buckets()
+        self.assertEqual((self.task_manager.today, self.task_manager.week_end), (today, today + timedelta(days=7)))
+        self.assertEqual(after, self.buckets(today))
+        self.assertEqual({task.id: (old_tab, new_tab) for task, old_tab, new_tab in moved},
+                         {task_id: (before[task_id], after[task_id]) for task_id in after if before[task_id] != after[task_id]})
+        return {(task.title, old_tab, new_tab) for task, old_tab, new_tab in moved}
+
+    def test_next_day_moves_tasks_across_both_bounds(self):
+        self.assertEqual(self.check_roll_over(date(2026, 10, 19)), {("due 19", "Week", "Day"), ("due 26", "Month", "Week")})
+
+    def test_jumps_forward_and_back_report_every_move(self):
+        self.assertEqual(len(self.check_roll_over(date(2026, 10, 28))), 12)
+        self.assertEqual(self.task_manager.tasks_in_bucket("Month"), [])
+        self.check_roll_over(date(2026, 10, 10))
+        self.assertEqual(len(self.task_manager.tasks_in_bucket("Day")), 0)
+        self.assertEqual(self.check_roll_over(date(2026, 10, 10)), set())
+
+    def test_bucket_lists_follow_the_new_day(self):
+        self.check_roll_over(date(2026, 10, 21))
+        titles = lambda bucket: [task.title for task in self.task_manager.tasks_in_bucket(bucket)]
+        self.assertEqual(titles("Day"), [f"due {day}" for day in range(16, 22)])
+        self.assertEqual(titles("Week"), [f"due {day}" for day in range(22, 29)])
+        self.assertEqual(titles("Month"), ["due 29", "due 30"])
+
+
+class QueryCacheTest(TaskManagerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task_manager.add_tasks([new_task("report", priority="High"), new_task("notes")])
+
+    def lookups(self):
+        stats = self.task_manager.get_cache_stats()
+        return stats["hits"], stats["stale"]
+
+    def titles(self, tasks):
+        return sorted(task.title for task in tasks)
+
+    def test_repeated_queries_are_served_from_the_cache(self):
+        self.assertEqual(self.titles(self.task_manager.filter_tasks("high")), ["report"])
+        first = self.task_manager.filter_tasks_by_priority("Normal")
+        first.clear()
+        self.assertEqual(self.titles(self.task_manager.filter_tasks("high")), ["report"])
+        self.assertEqual(self.titles(self.task_manager.filter_tasks_by_priority("Normal")), ["notes"])
+        self.assertEqual(self.lookups(), (2, 0))
+
+    def test_every_write_invalidates_cached_results(self):
+        other = TaskManager(self.user_id, self.backend)
+        other.load_all()
+        notes = other.find_by_title("notes")
+        notes.priority = "High"
+
+        writes = [
+            lambda: self.task_manager.add_task(new_task("ideas", priority="High")),
+            lambda: self.task_manager.update_task(Task(self.task_manager.find_by_title("report").id, "report",
+                                                       DUE, "Normal", "", "Pending")),
+            lambda: other.update_task(notes) and self.task_manager.refresh_tasks([notes.id]),
+            lambda: self.task_manager.remove_task(self.task_manager.find_by_title("ideas")),
+            lambda: self.task_manager.load_all(),
+        ]
+        expected = [["ideas", "report"], ["ideas"], ["ideas", "notes"], ["notes"], ["notes"]]
+        self.task_manager.filter_tasks_by_priority("High")
+        self.task_manager.filter_tasks("high")
+        for write, titles in zip(writes, expected):
+            write()
+            self.assertEqual(self.titles(self.task_manager.filter_tasks_by_priority("High")), titles)
+            self.assertEqual(self.titles(self.task_manager.filter_tasks("high")), titles)
+        self.assertEqual(self.lookups(), (0, 8))
+
+
+class PagingTest(TaskManagerTestCase):
+    def setUp(self):
+        super().setUp()
+        # Added out of due date order so that id order and (due_date, id) order differ.
+        days = [22, 20, 21, 20, 23, 20, 21]
+        self.task_manager.add_tasks([new_task(f"task {i}", due_date=datetime(2026, 10, day)) for i, day in enumerate(days)])
+        self.ordered = [task.id for task in sorted(self.task_manager.tasks.values(), key=lambda task: (task.due_date, task.id))]
+
+    def walk(self, fetch, limit, **bounds):
+        pages, after = [], None
+        while True:
+            tasks, after = fetch(after, limit, **bounds)
+            pages.append([task.id for task in tasks])
+            if after is None:
+                return pages
+            self.assertEqual(after, self.task_manager.page_key(tasks[-1]))
+
+    def test_pages_split_equal_due_dates_without_gaps_or_repeats(self):
+        for limit in (1, 2, 3, 7, 10):
+            for fetch in (self.task_manager.fetch_page, self.task_manager.page_tasks):
+                pages = self.walk(fetch, limit)
+                self.assertEqual(sum(pages, []), self.ordered, (fetch.__name__, limit))
+                self.assertTrue(all(len(page) == limit for page in pages[:-1]), (fetch.__name__, limit))
+        self.assertEqual([len(page) for page in self.walk(self.task_manager.page_tasks, 7)], [7])
+        self.assertEqual([len(page) for page in self.walk(self.task_manager.fetch_page, 7)], [7, 0])
+        self.assertEqual(self.task_manager.fetch_page(self.task_manager.page_key(self.task_manager.get_task(self.ordered[-1]))), ([], None))
+
+    def test_iter_pages_reads_every_task_once(self):
+        pages = list(self.task_manager.iter_pages(limit=3))
+        self.assertEqual([[task.id for task in page] for page in pages], [self.ordered[:3], self.ordered[3:6], self.ordered[6:]])
+        self.assertEqual([len(page) for page in self.task_manager.iter_pages(limit=7)], [7])
+
+    def test_page_tasks_keeps_to_the_due_date_bounds(self):
+        in_range = [task_id for task_id in self.ordered if date(2026, 10, 20) < self.task_manager.get_task(task_id).due_date.date() <= date(2026, 10, 22)]
+        pages = self.walk(self.task_manager.page_tasks, 2, start=date(2026, 10, 20), end=date(2026, 10, 22))
+        self.assertEqual(pages, [in_range[:2], in_range[2:]])
+        self.assertEqual(self.task_manager.page_tasks(start=date(2026, 10, 23)), ([], None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Program: transfer.py
+Imports tasks from CSV or JSON files and exports them, one user at a time.
+Files use the columns title, due_date (YYYY-MM-DD), priority, comments and status.
+Usage: python transfer.py import <user_id> <file.csv|file.json>
+       python transfer.py export <user_id> <file.csv|file.json>
+"""
+
+import csv
+import json
+import sys
+from datetime import datetime
+from itertools import islice
+from taskManager import Task, TaskManager, BATCH_SIZE
+
+FIELDS = ("title", "due_date", "priority", "comments", "status")
+IMPORT_BATCH_SIZE = BATCH_SIZE * 10
+
+
+def _file_format(path):
+    if path.lower().endswith(".csv"):
+        return "csv"
+    if path.lower().endswith(".json"):
+        return "json"
+    raise ValueError(f"Unsupported file type: {path}. Use .csv or .json.")
+
+
+def _to_task(record):
+    return Task(None, record["title"], datetime.strptime(record["due_date"], "%Y-%m-%d"),
+                record.get("priority") or "Normal", record.get("comments") or "", record.get("status") or "Pending")
+
+
+def _to_record(task):
+    return {"title": task.title, "due_date": task.due_date.strftime("%Y-%m-%d"),
+            "priority": task.priority, "comments": task.comments, "status": task.status}
+
+
+def import_tasks(task_manager, path):
+    with open(path, newline="", encoding="utf-8") as source:
+        if _file_format(path) == "csv":
+            records = csv.DictReader(source)
+        else:
+            records = iter(json.load(source))
+
+        imported = 0
+        while True:
+            batch = [_to_task(record) for record in islice(records, IMPORT_BATCH_SIZE)]
+            if not batch:
+                break
+            imported += len(task_manager.add_tasks(batch))
+    return imported
+
+
+def export_tasks(task_manager, path):
+    exported = 0
+    with open(path, "w", newline="", encoding="utf-8") as target:
+        if _file_format(path) == "csv":
+            writer = csv.DictWriter(target, fieldnames=FIELDS)
+            writer.writeheader()
+            for task in task_manager.iter_tasks():
+                writer.writerow(_to_record(task))
+                exported += 1
+        else:
+            target.write("[")
+            for task in task_manager.iter_tasks():
+                target.write(",\n" if exported else "\n")
+                target.write(json.dumps(_to_record(task)))
+                exported += 1
+            target.write("\n]\n")
+    return exported
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print(__doc__)
+        sys.exit(1)
+
+    command, user_id, path = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+    task_manager = TaskManager(user_id)
+    if command == "import":
+        task_manager.load_all()
+        print(f"Imported {import_tasks(task_manager, path)} tasks from {path}")
+    else:
+        print(f"Exported {export_tasks(task_manager, path)} tasks to {path}")
@@ -0,0 +1,45 @@
+from storage import ReplicaBackend
+
+
+def get_user_id(backend, username):
+    with backend.cursor() as cursor:
+        cursor.execute("SELECT id FROM users WHERE username=%s", (username,))
+        user = cursor.fetchone()
+    if user:
+        return user[0]
+    elif isinstance(backend, ReplicaBackend):
+        return get_remote_user_id(backend, username)
+    else:
+        return None
+
+
+def get_remote_user_id(backend, username):
+    try:
+        user_id = get_user_id(backend.remote, username)
+    except Exception:
+        return None
+    if user_id is not None:
+        mirror_user(backend, user_id, username)
+    return user_id
+
+
+def mirror_user(backend, user_id, username):
+    with backend.cursor(commit=True) as cursor:
+        cursor.execute("INSERT OR IGNORE INTO users (id, username) VALUES (%s, %s)", (user_id, username))
+
+
+def user_exists(backend, user_id):
+    with backend.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM users WHERE id=%s", (user_id,))
+        return cursor.fetchone() is not None
+
+
+def insert_user(backend, username):
+    if isinstance(backend, ReplicaBackend):
+        user_id = insert_user(backend.remote, username)
+        mirror_user(backend, user_id, username)
+        return user_id
+
+    with backend.cursor(commit=True) as cursor:
+        cursor.execute("INSERT INTO users (username) VALUES (%s)", (username,))
+        return cursor.lastrowid
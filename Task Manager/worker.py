@@ -0,0 +1,106 @@
+import queue
+import sys
+import tkinter as tk
+from tkinter import messagebox
+from concurrent.futures import ThreadPoolExecutor
+from database import PROFILER
+
+POLL_INTERVAL_MS = 30
+
+
+class BackgroundWorker:
+    """Runs blocking calls off the Tk thread and delivers their results on it.
+
+    Results and dispatched callbacks go through a thread-safe queue; only the Tk thread touches Tk,
+    draining the queue from a root.after loop that runs for the lifetime of the worker.
+
+    Submitting a job under a key supersedes the previous job with that key; its result is dropped.
+    Only reads that a newer request makes obsolete (load, filter, chart) use a key; writes are submitted
+    with key None so they are never superseded.
+    """
+
+    def __init__(self, root, max_workers=1, on_busy_change=None):
+        self.root = root
+        self.on_busy_change = on_busy_change
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.results = queue.Queue()
+        self.generations = {}
+        self.futures = {}
+        self.pending = 0
+        self.poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def submit(self, key, function, *args, on_success=None, on_error=None):
+        generation = None
+        if key is not None:
+            generation = self.generations.get(key, 0) + 1
+            self.generations[key] = generation
+            previous = self.futures.get(key)
+            if previous:
+                previous.cancel()
+
+        if PROFILER.enabled:
+            function, args = PROFILER.run_as, (PROFILER.caller(), function, *args)
+        future = self.executor.submit(function, *args)
+        if key is not None:
+            self.futures[key] = future
+        self._set_pending(self.pending + 1)
+        future.add_done_callback(lambda done: self.results.put(lambda: self._finish(key, generation, done, on_success, on_error)))
+        return future
+
+    def dispatch(self, callback, *args):
+        """Runs callback(*args) on the Tk thread; safe to call from any thread."""
+        self.results.put(lambda: callback(*args))
+
+    def cancel(self, key):
+        self.generations[key] = self.generations.get(key, 0) + 1
+        future = self.futures.pop(key, None)
+        if future:
+            future.cancel()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.poll_id:
+            try:
+                self.root.after_cancel(self.poll_id)
+            except tk.TclError:
+                pass
+            self.poll_id = None
+
+    def _set_pending(self, pending):
+        busy_changed = bool(pending) != bool(self.pending)
+        self.pending = pending
+        if busy_changed and self.on_busy_change:
+            self.on_busy_change(bool(pending))
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    callback = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    callback()
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            if self.poll_id:
+                try:
+                    self.poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+                except tk.TclError:
+                    self.poll_id = None
+
+    def _finish(self, key, generation, future, on_success, on_error):
+        self._set_pending(self.pending - 1)
+        if generation != self.generations.get(key) or future.cancelled():
+            return
+        self.futures.pop(key, None)
+
+        error = future.exception()
+        if error is None:
+            if on_success:
+                on_success(future.result())
+        elif on_error:
+            on_error(error)
+        else:
+            messagebox.showerror("Error", str(error))